@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+bench_entry_memory.py
+
+Per-entry memory of the parsed-bib representation: BibEntry (slots, interned and
+shared field layouts) vs the plain {"type", "key", "fields": {...}} dicts
+parse_bib used to return. Measured with tracemalloc on synthetic bibs.
+
+    python benchmarks/bench_entry_memory.py --sizes 10000 100000 [--json out.json]
+"""
+import argparse, gc, json, os, sys, tracemalloc
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import bibtools
+from synthetic import synthetic_bib
+
+def parse_as_dicts(text: str) -> Dict[str, Dict]:
+    """The pre-BibEntry representation: one dict per entry plus a fields dict with fresh name strings."""
+    entries = {}
+    for raw in bibtools.scan_entries(text):
+        if raw.type in bibtools.SPECIAL_TYPES or not raw.key:
+            continue
+        entries[raw.key] = {"type": raw.type, "key": raw.key, "fields": bibtools.entry_fields(text, raw)}
+    return entries
+
+def retained_bytes(parse, text: str) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = parse(text)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-entry memory of dict vs BibEntry parse results.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Entry counts (default 10000 100000)")
+    ap.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    args = ap.parse_args()
+
+    results = []
+    for size in args.sizes:
+        text = synthetic_bib(size)
+        n = sum(1 for raw in bibtools.scan_entries(text) if raw.key)
+        dicts = retained_bytes(parse_as_dicts, text)
+        slots = retained_bytes(bibtools.parse_entries, text)
+        results.append({"entries": n, "dict_bytes_per_entry": dicts / n, "bibentry_bytes_per_entry": slots / n,
+                        "saving": 1 - slots / dicts})
+        print(f"{n:>8} entries | dict {dicts / n:8.0f} B/entry | BibEntry {slots / n:8.0f} B/entry | -{100 * (1 - slots / dicts):.0f}%")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
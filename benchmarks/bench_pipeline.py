@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py
+
+Times each stage of the schedule/bib pipeline on synthetic inputs and checks that
+rendered output still matches benchmarks/golden.json byte for byte, and that
+prune_bib_old.py finds the same citekeys build_schedule.py renders.
+
+Stages: parse_bib, find_bib_blocks, apa_html_and_plain (every cited entry),
+preprocess_dates, inject_popovers, transform (fused dates + citations) and
+collect_with_crossrefs.
+
+    python benchmarks/bench_pipeline.py --sizes 1000 10000 100000 --json results.json
+    python benchmarks/bench_pipeline.py --compare results_before.json
+    python benchmarks/bench_pipeline.py --golden-only            # just the output check
+    python benchmarks/bench_pipeline.py --update-golden          # after an intended output change
+"""
+import argparse, hashlib, json, os, platform, subprocess, sys, tempfile, time
+from datetime import datetime
+from typing import Callable, Dict, List
+from zoneinfo import ZoneInfo
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+import bibtools
+import build_schedule as bs
+import prune_bib_old as pb
+from synthetic import synthetic_bib, synthetic_schedule
+
+GOLDEN_PATH = os.path.join(HERE, "golden.json")
+GOLDEN_ENTRIES, GOLDEN_CITES = 500, 400
+START_DT = datetime(2026, 1, 21, tzinfo=ZoneInfo("America/Chicago"))
+REGRESSION = 1.10
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def best_of(fn: Callable, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+# ---------------- Golden output ----------------
+def _pruned_bib(text: str, cited) -> str:
+    entries, specials = pb.find_bib_blocks(text)
+    keep = pb.collect_with_crossrefs(set(cited), entries)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "pruned.bib")
+        bibtools.write_bib(out, [b for k, b in entries.items() if k in keep], specials)
+        with open(out, "r", encoding="utf-8") as f:
+            return f.read()
+
+def render_digests(bib_text: str, md: str) -> Dict:
+    entries = bs.parse_bib(bib_text)
+    keys = bs.collect_keys(bs.preprocess_dates(md, START_DT))
+    refs = {k: sha256("\0".join(bs.apa_html_and_plain(entries[k]))) for k in sorted(keys) if k in entries}
+    return {
+        "refs": refs,
+        "schedule_inline": sha256("".join(bs.transform_chunks(md, START_DT, bs.CitationResolver(entries), "inline"))),
+        "schedule_table": sha256("".join(bs.transform_chunks(md, START_DT, bs.CitationResolver(entries), "table"))),
+        "pruned_bib": sha256(_pruned_bib(bib_text, keys)),
+    }
+
+def current_golden() -> Dict:
+    bib = synthetic_bib(GOLDEN_ENTRIES)
+    keys = [raw.key for raw in bs.bibtools.scan_entries(bib) if raw.key]
+    golden = {"synthetic": render_digests(bib, synthetic_schedule(keys, GOLDEN_CITES))}
+    site_md = os.path.join(ROOT, "content", "schedule_bib.md")
+    site_bib = os.path.join(ROOT, "content", "bib", "grad_methods.bib")
+    if os.path.exists(site_md) and os.path.exists(site_bib):
+        with open(site_md, "r", encoding="utf-8") as f, open(site_bib, "r", encoding="utf-8") as g:
+            golden["site"] = render_digests(g.read(), f.read())
+    return golden
+
+CITE_FORMS = (r"@plain, @dotted.key. [@a; @b] \cite{c1, c2} \citet[p. 3]{d} \citep[see][ch. 2]{e1,e2} "
+              r"\cite*{f} \textcite{g} mail@example.com")
+
+def check_cited_keys() -> bool:
+    """prune_bib_old.py must keep exactly the keys build_schedule.py looks up when rendering."""
+    docs = {"forms": CITE_FORMS}
+    site_md = os.path.join(ROOT, "content", "schedule_bib.md")
+    if os.path.exists(site_md):
+        with open(site_md, "r", encoding="utf-8") as f:
+            docs["site"] = f.read()
+    ok = True
+    for name, md in docs.items():
+        resolver = bs.CitationResolver({})
+        "".join(bs.transform_chunks(md, START_DT, resolver))
+        pruned = pb.extract_keys_from_text(md)
+        if resolver.seen != pruned:
+            ok = False
+            print(f"[keys] {name}: build only {sorted(resolver.seen - pruned)}, prune only {sorted(pruned - resolver.seen)}")
+    print("[keys] ok" if ok else "[keys] MISMATCH between build_schedule.py and prune_bib_old.py")
+    return ok
+
+def check_golden(update: bool = False) -> bool:
+    got = current_golden()
+    if update or not os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+            json.dump(got, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"[golden] wrote {GOLDEN_PATH}")
+        return True
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        want = json.load(f)
+    ok = True
+    for name in sorted(set(want) | set(got)):
+        w, g = want.get(name, {}), got.get(name, {})
+        bad_refs = sorted(k for k in set(w.get("refs", {})) | set(g.get("refs", {}))
+                          if w.get("refs", {}).get(k) != g.get("refs", {}).get(k))
+        bad_docs = sorted(k for k in set(w) | set(g) if k != "refs" and w.get(k) != g.get(k))
+        if bad_refs or bad_docs:
+            ok = False
+            print(f"[golden] {name}: {len(bad_refs)} references differ {bad_refs[:10]}; outputs differ: {bad_docs}")
+    print("[golden] ok" if ok else "[golden] MISMATCH (run with --update-golden if the change is intended)")
+    return ok
+
+# ---------------- Timings ----------------
+def bench_size(n: int, n_cites: int, repeat: int) -> List[Dict]:
+    bib = synthetic_bib(n)
+    keys = [raw.key for raw in bs.bibtools.scan_entries(bib) if raw.key]
+    md = synthetic_schedule(keys, n_cites)
+    n_entries = len(keys)
+    rows = []
+    def record(stage, seconds, items):
+        rows.append({"entries": n_entries, "stage": stage, "seconds": seconds, "items": items,
+                     "us_per_item": seconds / max(items, 1) * 1e6})
+        print(f"{n_entries:>9} entries | {stage:<24} {seconds * 1000:10.1f} ms | {items:>8} items")
+
+    t, entries = best_of(lambda: bs.parse_bib(bib), repeat); record("parse_bib", t, n_entries)
+    links: Dict = {}
+    t, (blocks, _) = best_of(lambda: pb.find_bib_blocks(bib, links), repeat); record("find_bib_blocks", t, n_entries)
+    t, md1 = best_of(lambda: bs.preprocess_dates(md, START_DT), repeat); record("preprocess_dates", t, len(md))
+    cited = sorted(bs.collect_keys(md1))
+    t, citations = best_of(lambda: {k: bs.apa_html_and_plain(entries[k]) for k in cited if k in entries}, repeat)
+    record("apa_html_and_plain", t, len(cited))
+    t, _ = best_of(lambda: bs.inject_popovers(md1, citations), repeat); record("inject_popovers", t, n_cites)
+    t, _ = best_of(lambda: "".join(bs.transform_chunks(md, START_DT, bs.CitationResolver(entries))), repeat)
+    record("transform", t, n_cites)
+    t, _ = best_of(lambda: pb.collect_with_crossrefs(set(cited), blocks, links), repeat)
+    record("collect_with_crossrefs", t, len(cited))
+    return rows
+
+def compare(rows: List[Dict], path: str) -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        old = {(r["entries"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    print(f"\n[compare] against {path} (>{REGRESSION:.2f}x flagged)")
+    for r in rows:
+        before = old.get((r["entries"], r["stage"]))
+        if before:
+            ratio = r["seconds"] / before
+            flag = "  SLOWER" if ratio > REGRESSION else ""
+            print(f"{r['entries']:>9} entries | {r['stage']:<24} {ratio:6.2f}x{flag}")
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main():
+    ap = argparse.ArgumentParser(description="Time the schedule/bib pipeline stages on synthetic inputs.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Synthetic bib sizes (default 1000 10000)")
+    ap.add_argument("--cites", type=int, default=2000, help="Citations in the synthetic schedule (default 2000)")
+    ap.add_argument("--repeat", type=int, default=3, help="Best of this many runs per stage (default 3)")
+    ap.add_argument("--json", dest="json_out", help="Write results to this JSON file")
+    ap.add_argument("--compare", help="Earlier --json results to compare against")
+    ap.add_argument("--golden-only", action="store_true", help="Only run the golden-output check")
+    ap.add_argument("--update-golden", action="store_true", help="Rewrite benchmarks/golden.json from the current code")
+    args = ap.parse_args()
+
+    ok = check_golden(update=args.update_golden)
+    ok = check_cited_keys() and ok
+    if args.golden_only or args.update_golden:
+        sys.exit(0 if ok else 1)
+
+    rows: List[Dict] = []
+    for n in args.sizes:
+        rows += bench_size(n, args.cites, args.repeat)
+    if args.json_out:
+        meta = {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                "time": datetime.now().isoformat(timespec="seconds"), "cites": args.cites, "repeat": args.repeat}
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": rows}, f, indent=1)
+    if args.compare:
+        compare(rows, args.compare)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+check_linkcheck.py
+
+Exercises linkcheck.py against a local http.server (no network): ok, dead, permanent vs
+temporary redirects, redirect loops, HEAD refused (405/403) -> GET fallback, unverified,
+unreachable hosts, and the TTL result cache (fresh results are not re-fetched, stale ones
+are, errors are never cached).
+
+    python benchmarks/check_linkcheck.py
+"""
+import os, socket, sys, tempfile, threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import linkcheck
+
+# path -> (HEAD status, GET status, Location)
+ROUTES: Dict[str, Tuple[int, int, str]] = {
+    "/ok": (200, 200, ""),
+    "/dead": (404, 404, ""),
+    "/moved": (301, 301, "/ok"),
+    "/moved-308": (308, 308, "/ok"),
+    "/temp": (302, 302, "/ok"),
+    "/temp-to-moved": (307, 307, "/moved"),
+    "/loop": (302, 302, "/loop"),
+    "/get-only": (405, 200, ""),
+    "/head-forbidden": (403, 200, ""),
+    "/locked": (403, 403, ""),
+    "/rate-limited": (429, 429, ""),
+    "/gone-on-get": (501, 410, ""),
+}
+
+# path -> (status, code)
+EXPECTED: Dict[str, Tuple[str, int]] = {
+    "/ok": ("ok", 200),
+    "/dead": ("dead", 404),
+    "/moved": ("moved", 200),
+    "/moved-308": ("moved", 200),
+    "/temp": ("ok", 200),
+    "/temp-to-moved": ("moved", 200),
+    "/loop": ("dead", 302),
+    "/get-only": ("ok", 200),
+    "/head-forbidden": ("ok", 200),
+    "/locked": ("unverified", 403),
+    "/rate-limited": ("unverified", 429),
+    "/gone-on-get": ("dead", 410),
+}
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits: Counter = Counter()
+    lock = threading.Lock()
+
+    def _answer(self, method: str) -> None:
+        with self.lock:
+            self.hits[(method, self.path)] += 1
+        head, get, location = ROUTES.get(self.path, (404, 404, ""))
+        self.send_response(head if method == "HEAD" else get)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._answer("HEAD")
+
+    def do_GET(self):
+        self._answer("GET")
+
+    def log_message(self, fmt, *args):
+        pass
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def check(server_url: str, cache_dir: str) -> List[str]:
+    """Problems found (empty when linkcheck behaves)."""
+    problems: List[str] = []
+    urls = [server_url + p for p in ROUTES]
+    unreachable = f"http://127.0.0.1:{closed_port()}/x"
+
+    # ---------------- Statuses ----------------
+    results = linkcheck.check_links(urls + [unreachable], cache_dir, jobs=4, rate=0, timeout=5)
+    for path, (status, code) in EXPECTED.items():
+        r = results[server_url + path]
+        if (r.status, r.code) != (status, code):
+            problems.append(f"{path}: got {r.status}/{r.code} ({r.detail}), want {status}/{code}")
+    moved = results[server_url + "/moved"]
+    if moved.final != server_url + "/ok":
+        problems.append(f"/moved: final URL {moved.final}, want {server_url}/ok")
+    if results[server_url + "/loop"].detail != "too many redirects":
+        problems.append(f"/loop: detail {results[server_url + '/loop'].detail!r}")
+    if results[unreachable].status != "error":
+        problems.append(f"unreachable host: got {results[unreachable].status}, want error")
+    for path in ("/get-only", "/head-forbidden"):
+        if not Handler.hits[("GET", path)]:
+            problems.append(f"{path}: no GET after HEAD was refused")
+    if Handler.hits[("GET", "/ok")]:
+        problems.append("/ok: fetched with GET although HEAD answered")
+
+    # ---------------- Cache ----------------
+    cached = linkcheck.load_cache(cache_dir)
+    if set(cached) != set(urls):
+        problems.append(f"cache holds {sorted(set(cached) ^ set(urls))} unexpectedly (errors must not be cached)")
+    before = sum(Handler.hits.values())
+    again = linkcheck.check_links(urls, cache_dir, jobs=4, rate=0, timeout=5)
+    if sum(Handler.hits.values()) != before:
+        problems.append(f"fresh cache: {sum(Handler.hits.values()) - before} requests, want 0")
+    if {u: r.status for u, r in again.items()} != {u: results[u].status for u in urls}:
+        problems.append("fresh cache: statuses differ from the first run")
+    heads = {p: Handler.hits[("HEAD", p)] for p in ROUTES}
+    linkcheck.check_links(urls, cache_dir, ttl_hours=0, jobs=4, rate=0, timeout=5)
+    stale = [p for p in ROUTES if Handler.hits[("HEAD", p)] == heads[p]]
+    if stale:
+        problems.append(f"ttl 0: not re-checked: {stale}")
+    before = sum(Handler.hits.values())
+    linkcheck.check_links(urls, cache_dir, jobs=4, rate=0, timeout=5, use_cache=False)
+    if sum(Handler.hits.values()) - before < len(urls):
+        problems.append("use_cache=False: cached results were used")
+    return problems
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            problems = check(f"http://127.0.0.1:{server.server_port}", cache_dir)
+    finally:
+        server.shutdown()
+        server.server_close()
+    for p in problems:
+        print(f"[linkcheck] {p}")
+    print("[linkcheck] ok" if not problems else f"[linkcheck] {len(problems)} FAILED")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
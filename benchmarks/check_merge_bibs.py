@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+check_merge_bibs.py
+
+Checks merge_bibs.py on small hand-written files: @string macros defined differently in two
+files (the earlier file's value is written once, the conflict is reported with the entries
+that use it), new macros from a later file are kept, and a file whose entries are all
+dropped contributes no @string/@preamble/@comment blocks.
+
+    python benchmarks/check_merge_bibs.py
+"""
+import os, sys, tempfile
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import bibtools
+import merge_bibs
+
+FILES = {
+    "first.bib": """@string{jep = {Journal of Experimental Psychology}}
+@string{pr = "Psychological Review"}
+@article{a1, author = {Smith, J.}, title = {One}, year = {2001}, journal = jep, doi = {10.1000/one}}
+""",
+    "second.bib": """@string{jep = {Journal of Economic Perspectives}}
+@string{pr = "Psychological Review", qj = {Quarterly Journal}}
+@comment{second}
+@article{b1, author = {Doe, A.}, title = {Two}, year = {2002}, journal = jep}
+@article{b2, author = {Roe, B.}, title = {Three}, year = {2003}, journal = qj # { of Economics}}
+""",
+    "dropped.bib": """@string{jep = {Journal of Something Else}}
+@comment{dropped}
+@article{c1, author = {Smith, J.}, title = {One}, year = {2001}, journal = jep, doi = {10.1000/one}}
+""",
+}
+
+# journal of each kept entry in the merged file, as BibTeX would read it
+EXPECTED: Dict[str, str] = {
+    "a1": "Journal of Experimental Psychology",
+    "b1": "Journal of Experimental Psychology",   # reported below: second.bib meant Economic Perspectives
+    "b2": "Quarterly Journal of Economics",
+}
+
+def check(tmp: str) -> List[str]:
+    problems: List[str] = []
+    paths = []
+    for name, text in FILES.items():
+        paths.append(os.path.join(tmp, name))
+        with open(paths[-1], "w", encoding="utf-8") as f:
+            f.write(text)
+    merged = merge_bibs.merge(paths)
+    out = os.path.join(tmp, "merged.bib")
+    bibtools.write_bib(out, merged.blocks, merged.specials)
+    with open(out, "r", encoding="utf-8") as f:
+        text = f.read()
+    entries = bibtools.parse_entries(text)
+    got = {k: e.get("journal", "") for k, e in entries.items()}
+    if got != EXPECTED:
+        problems.append(f"journals: got {got}, want {EXPECTED}")
+    strings = [raw for raw in bibtools.scan_entries(text) if raw.type == "string"]
+    names = [n for raw in strings for n in bibtools.entry_fields(text, raw)]
+    if sorted(names) != ["jep", "pr", "qj"]:
+        problems.append(f"@string names written: {sorted(names)}, want each of jep, pr, qj once")
+    if merged.macro_conflicts != [("jep", paths[1], paths[0], ["b1"])]:
+        problems.append(f"macro conflicts: {merged.macro_conflicts}")
+    if "dropped" in text or "Something Else" in text:
+        problems.append("specials of a file with no kept entries were written")
+    if "@comment{second}" not in text:
+        problems.append("@comment of a file with kept entries was dropped")
+    return problems
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        problems = check(tmp)
+    for p in problems:
+        print(f"[merge] {p}")
+    print("[merge] ok" if not problems else f"[merge] {len(problems)} FAILED")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+check_resident_bib.py
+
+Checks that bibtools.ResidentBib.update (build_schedule.py --watch) gives the same entries as
+a fresh parse after each edit in a sequence: field edits, an entry moved above or below the
+@string it uses, a macro redefined, entries added and removed. Also checks that entries
+whose text and macro scope are unchanged are not re-parsed.
+
+    python benchmarks/check_resident_bib.py
+"""
+import os, sys
+from typing import List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import bibtools
+
+A = "@article{a, title = {A}, journal = jep, year = {2001}}\n"
+B = "@article{b, title = {B}, journal = pr, year = {2002}}\n"
+C = "@article{c, title = {C}, journal = {Cognition}, year = {2003}}\n"
+JEP = "@string{jep = {Journal of Experimental Psychology}}\n"
+JEP2 = "@string{jep = {Journal of Economic Perspectives}}\n"
+PR = "@string{pr = {Psychological Review}}\n"
+
+# (what the edit does, new file text, entries update() should re-parse)
+EDITS: List[Tuple[str, str, int]] = [
+    ("initial", JEP + PR + A + B + C, 3),
+    ("unchanged", JEP + PR + A + B + C, 0),
+    ("field edit", JEP + PR + A + B + C.replace("2003", "2004"), 1),
+    ("entry moved above its @string", A + JEP + PR + B + C.replace("2003", "2004"), 1),
+    ("entry moved back below it", JEP + PR + A + B + C.replace("2003", "2004"), 1),
+    ("@string moved below an entry (and C edited back)", JEP + A + PR + B + C, 2),
+    ("entries reordered, same scope", JEP + A + PR + C + B, 0),
+    ("macro redefined later in the file", JEP + A + PR + C + B + JEP2, 3),
+    ("entry moved past the redefinition", JEP + PR + C + B + JEP2 + A, 1),
+    ("entry removed", JEP + PR + C + JEP2 + A, 0),
+    ("entry added", JEP + PR + C + JEP2 + A + B, 1),
+]
+
+def check() -> List[str]:
+    problems: List[str] = []
+    resident = bibtools.ResidentBib()
+    for what, text, want_parsed in EDITS:
+        parsed = resident.update(text)
+        fresh = bibtools.parse_entries(text)
+        got = {k: dict(e.items()) for k, e in resident.items()}
+        want = {k: dict(e.items()) for k, e in fresh.items()}
+        if got != want:
+            diff = sorted(k for k in set(got) | set(want) if got.get(k) != want.get(k))
+            problems.append(f"{what}: entries differ from a fresh parse: {diff}")
+        if parsed != want_parsed:
+            problems.append(f"{what}: re-parsed {parsed} entries, want {want_parsed}")
+    return problems
+
+def main():
+    problems = check()
+    for p in problems:
+        print(f"[resident] {p}")
+    print("[resident] ok" if not problems else f"[resident] {len(problems)} FAILED")
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
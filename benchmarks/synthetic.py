@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+synthetic.py
+
+Deterministic synthetic inputs for the benchmarks in this directory.
+
+- synthetic_bib(n): a .bib with n entries mixing @article/@book/@inproceedings/
+  @incollection/arXiv @misc, some with structured `family=/given=` authors. Every
+  10th entry is an @inproceedings that crossrefs its own @proceedings parent
+  (so the file holds n + n/10 entries).
+- synthetic_schedule(keys): schedule markdown in the schedule_bib.md format, with
+  `r advdate(...)` headings and many @key citations.
+"""
+import random
+from typing import List, Sequence
+
+FAMILIES = ["Lupyan", "Smith", "Garcia", "Nguyen", "Müller", "Okafor", "Kowalski", "Tanaka",
+            "Silva", "Cohen", "Novak", "Ward", "Larsen", "Moreira", "Dubois", "Rossi"]
+GIVENS = ["Gary", "Anna", "J. P.", "Maria", "Wei", "Chidi", "Ewa", "Hiro", "Lucas", "Sarah"]
+PREFIXES = ["van der", "de", "von"]
+WORDS = ["language", "perception", "memory", "reliability", "causal", "inference", "models",
+         "replication", "attention", "learning", "category", "effect", "sampling", "validity"]
+JOURNALS = ["Psychological Science", "Cognition", "Behavior Research Methods", "Nature Human Behaviour"]
+PUBLISHERS = ["The MIT Press", "Psychology Press", "Oxford University Press"]
+CROSSREF_EVERY = 10
+
+
+def _person(rng: random.Random, structured: bool) -> str:
+    if structured:
+        prefix = rng.choice(PREFIXES)
+        return f"family={rng.choice(FAMILIES)}, given={rng.choice(GIVENS)}, prefix={prefix}, useprefix={rng.choice(['true', 'false'])}"
+    return f"{rng.choice(FAMILIES)}, {rng.choice(GIVENS)}"
+
+
+def _authors(rng: random.Random, structured: bool = False) -> str:
+    return " and ".join(_person(rng, structured and j == 0) for j in range(rng.randint(1, 5)))
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 10))).capitalize()
+
+
+def _abstract(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))
+
+
+def proceedings_key(i: int) -> str:
+    return f"cogsci{2000 + i // CROSSREF_EVERY % 25}proc_{i // CROSSREF_EVERY}"
+
+
+def synthetic_entry(i: int, rng: random.Random) -> str:
+    key = f"{rng.choice(FAMILIES).lower()}{_title(rng).split()[0]}{1950 + i % 75}_{i}"
+    structured = i % 8 == 5
+    kind = i % 5
+    lines: List[str] = []
+    if i % CROSSREF_EVERY == 0:
+        # parent first, so pruning has to pull it in through the child's crossref
+        lines += [f"@proceedings{{{proceedings_key(i)},",
+                  f"  title = {{Proceedings of the {i // CROSSREF_EVERY % 40}th Annual Meeting of the Cognitive Science Society}},",
+                  f"  year = {{{2000 + i // CROSSREF_EVERY % 25}}},", "  publisher = {Cognitive Science Society},", "}", ""]
+        lines += [f"@inproceedings{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  crossref = {{{proceedings_key(i)}}},",
+                  f"  booktitle = {{Proceedings of the {i // CROSSREF_EVERY % 40}th Annual Meeting of the Cognitive Science Society}},",
+                  f"  year = {{{2000 + i // CROSSREF_EVERY % 25}}},",
+                  f"  pages = {{{rng.randint(1, 500)}--{rng.randint(501, 900)}}},"]
+    elif kind == 0:
+        lines += [f"@article{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  date = {{{1950 + i % 75}-{1 + i % 12:02d}}},", f"  journaltitle = {{{rng.choice(JOURNALS)}}},",
+                  f"  volume = {{{rng.randint(1, 150)}}},", f"  number = {{{rng.randint(1, 12)}}},",
+                  f"  pages = {{{rng.randint(1, 500)}--{rng.randint(501, 900)}}},",
+                  f"  doi = {{10.{1000 + i % 9000}/synthetic.{i}}},"]
+    elif kind == 1:
+        lines += [f"@book{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  year = {{{1950 + i % 75}}},", f"  publisher = {{{rng.choice(PUBLISHERS)}}},",
+                  f"  isbn = {{978-0-{i:06d}-0}},"]
+    elif kind == 2:
+        lines += [f"@inproceedings{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  year = {{{1950 + i % 75}}},",
+                  f"  booktitle = {{Proceedings of the {40 + i % 10}th Annual Meeting of the Cognitive Science Society}},",
+                  f"  pages = {{{rng.randint(1, 500)}--{rng.randint(501, 900)}}},"]
+    elif kind == 3:
+        lines += [f"@incollection{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  year = {{{1950 + i % 75}}},", f"  booktitle = {{{_title(rng)}}},",
+                  f"  editor = {{{_authors(rng)}}},", f"  publisher = {{{rng.choice(PUBLISHERS)}}},",
+                  f"  pages = {{{rng.randint(1, 500)}--{rng.randint(501, 900)}}},"]
+    else:
+        lines += [f"@misc{{{key},", f"  title = {{{_title(rng)}}},", f"  author = {{{_authors(rng, structured)}}},",
+                  f"  date = {{{2015 + i % 10}}},", "  eprinttype = {arxiv},", f"  eprint = {{2{i % 10}0{i % 9}.{i:05d}}},",
+                  f"  url = {{https://arxiv.org/abs/2{i % 10}0{i % 9}.{i:05d}}},"]
+    lines += [f"  abstract = {{{_abstract(rng)}}},", f"  keywords = {{{rng.choice(WORDS)},{rng.choice(WORDS)}}}", "}"]
+    return "\n".join(lines)
+
+
+def synthetic_bib(n: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(synthetic_entry(i, rng) for i in range(n)) + "\n"
+
+
+def synthetic_schedule(keys: Sequence[str], n_cites: int = 2000, weeks: int = 15, seed: int = 0) -> str:
+    """Schedule markdown citing n_cites keys drawn (with repeats) from keys."""
+    rng = random.Random(seed)
+    per_week = max(1, n_cites // (2 * weeks))
+    out = ['```{r setup, include=FALSE}', 'lecture <- as.Date("2026-01-21")', 'section <- as.Date("2026-01-26")',
+           '```', '', '# Class Schedule', '']
+    remaining = n_cites
+    week = 0
+    while remaining > 0:
+        week += 1
+        out.append(f"## `r advdate(lecture, {week})` _{_title(rng)}_")
+        out.append("")
+        k = min(per_week, remaining); remaining -= k
+        out.append("* **Readings:** " + "; ".join("@" + rng.choice(keys) for _ in range(k)))
+        out.append("")
+        out.append(f"### `r advdate(section, {week})`")
+        k = min(per_week, remaining); remaining -= k
+        if k:
+            out.append("* Read for section: " + "; ".join("@" + rng.choice(keys) for _ in range(k))
+                       + f" (due advdate(wed, {week + 1}))")
+        out.append("")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+bibtools.py
+
+Shared BibTeX tokenizer used by build_schedule.py and prune_bib_old.py.
+
+- scan_entries() finds top-level @type{...} / @type(...) blocks and yields them
+  with their (start, end) offsets, so callers can slice the original text verbatim.
+- parse_fields() splits one entry body into {name: value}, handling {...} and "..."
+  delimiters, bare numbers/macros and `#` concatenation.
+- parse_entries() parses a whole file, expanding @string macros in file order.
+- Entries are BibEntry objects: __slots__, interned type/field names, and field
+  values in a tuple whose name -> position map is shared by every entry with
+  the same field layout.
+- entry_links() lists an entry's crossref/xref/xdata/related/entryset targets; only
+  entries that mention one of those fields are parsed to find them. rewrite_links() renames
+  those targets in an entry's verbatim text.
+- CITE_RE / cited_keys() find the citekeys of a document (@key, \\cite{...} variants) for
+  both build_schedule.py and prune_bib_old.py.
+- Name normalization (LaTeX accents -> Unicode, family names) and write_bib() are shared by
+  build_schedule.py, prune_bib_old.py and merge_bibs.py.
+- ResidentBib keeps a parsed file in memory and, on update(), re-parses only the
+  entries whose text changed.
+- LazyBib indexes a file (over mmap) as citekey -> byte span in one scan and only
+  parses the entries that are actually looked up.
+- LayeredBib reads several bibs in priority order, loading a lower layer only when a key
+  is not found above it, and resolves alias keys (see merge_bibs.py) to their entries.
+
+Scanning never walks the text one character at a time in Python: compiled regexes
+jump straight between the structural characters (@ { } ( ) " , = #).
+"""
+import json, mmap, re, sys, threading, unicodedata
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+SPECIAL_TYPES = ("string", "preamble", "comment")
+# fields naming other entries that must travel with this one (BibTeX crossref, BibLaTeX xref/xdata/related/@set)
+LINK_FIELDS = ("crossref", "xref", "xdata", "related", "entryset")
+# bump when parse output changes, so cached parses (buildcache.py) are invalidated
+PARSER_VERSION = 2
+
+# ---------------- Patterns ----------------
+class _Syntax:
+    """Entry-level patterns, compiled for str or for bytes (bytes also covers mmap)."""
+    def __init__(self, conv):
+        self.entry_start = re.compile(conv(r"@[ \t]*([A-Za-z]+)\s*([{(])"))
+        self.braces = re.compile(conv(r"[{}]"))
+        self.paren_end = re.compile(conv(r"[{})]"))
+        self.lbrace, self.rbrace, self.comma = conv("{"), conv("}"), conv(",")
+        # anchored on the comma before a field name: a literal first char keeps the search fast
+        self.link_hint = re.compile(conv(r",\s*(?i:%s)\s*=" % "|".join(LINK_FIELDS)))
+
+_STR = _Syntax(str)
+_BYTES = _Syntax(lambda s: s.encode("ascii"))
+
+def _syntax(text) -> _Syntax:
+    return _STR if isinstance(text, str) else _BYTES
+
+ENTRY_START_RE = _STR.entry_start
+BRACES_RE = _STR.braces
+PAREN_END_RE = _STR.paren_end
+QUOTE_END_RE = re.compile(r'[{}"]')
+COMMA_RE = re.compile(r"[{},]")
+FIELD_NAME_RE = re.compile(r'[\s,]*([^\s=,{}"#]+)\s*=\s*')
+BARE_VALUE_RE = re.compile(r'[^\s,#{}"]+')
+CONCAT_RE = re.compile(r"\s*#\s*")
+SEP_RE = re.compile(r"\s*,")
+
+
+class RawEntry(NamedTuple):
+    type: str    # lower-cased entry type
+    key: str     # citekey ("" for @string/@preamble/@comment and keyless blocks)
+    start: int   # offset of the '@'
+    end: int     # offset just past the closing delimiter
+    body: int    # offset where the field list starts
+
+
+# ---------------- Entry representation ----------------
+class _Shape:
+    """Field layout shared by all entries with the same (ordered) field names."""
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.index = {n: i for i, n in enumerate(names)}
+
+
+_SHAPES: Dict[Tuple[str, ...], _Shape] = {}
+
+
+def _shape_for(names: Tuple[str, ...]) -> _Shape:
+    shape = _SHAPES.get(names)
+    if shape is None:
+        names = tuple(sys.intern(n) for n in names)
+        shape = _SHAPES[names] = _Shape(names)
+    return shape
+
+
+class BibEntry:
+    """One parsed entry: .type, .key and read-only field access (get/items/fields)."""
+    __slots__ = ("type", "key", "_shape", "_values")
+
+    def __init__(self, etype: str, key: str, fields: Dict[str, str]):
+        self.type = sys.intern(etype)
+        self.key = key
+        self._shape = _shape_for(tuple(fields))
+        self._values = tuple(fields.values())
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        i = self._shape.index.get(name)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._shape.index
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        return zip(self._shape.names, self._values)
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def __getitem__(self, item: str):
+        # dict-style access kept for callers written against the old {"type","key","fields"} dicts
+        if item in ("type", "key", "fields"):
+            return getattr(self, item)
+        raise KeyError(item)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BibEntry):
+            return NotImplemented
+        return (self.type, self.key, self.fields) == (other.type, other.key, other.fields)
+
+    def __repr__(self) -> str:
+        return f"BibEntry({self.type!r}, {self.key!r}, {self.fields!r})"
+
+    def __reduce__(self):
+        return (_restore_entry, (self.type, self.key, self._shape.names, self._values))
+
+
+def _restore_entry(etype: str, key: str, names: Tuple[str, ...], values: Tuple[str, ...]) -> BibEntry:
+    e = BibEntry.__new__(BibEntry)
+    e.type, e.key = sys.intern(etype), key
+    e._shape, e._values = _shape_for(names), values
+    return e
+
+
+# ---------------- Low-level scanners ----------------
+def match_brace(text: str, pos: int, end: int) -> int:
+    """Return the offset of the '}' closing the '{' at pos (or end if unbalanced)."""
+    syn = _syntax(text)
+    close = text.find(syn.rbrace, pos + 1, end)
+    if close != -1 and text.find(syn.lbrace, pos + 1, close) == -1:
+        return close  # fast path: no nested braces
+    depth = 0
+    for m in syn.braces.finditer(text, pos, end):
+        if m.group() == syn.lbrace:
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return m.start()
+    return end
+
+
+def _match_paren(text: str, pos: int, end: int) -> int:
+    syn = _syntax(text)
+    depth = 0
+    for m in syn.paren_end.finditer(text, pos + 1, end):
+        ch = m.group()
+        if ch == syn.lbrace:
+            depth += 1
+        elif ch == syn.rbrace:
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            return m.start()
+    return end
+
+
+def _match_quote(text: str, pos: int, end: int) -> int:
+    depth = 0
+    for m in QUOTE_END_RE.finditer(text, pos + 1, end):
+        ch = m.group()
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            return m.start()
+    return end
+
+
+def _next_comma(text: str, pos: int, end: int) -> int:
+    """Offset of the next ',' outside braces (or end)."""
+    m = SEP_RE.match(text, pos, end)
+    if m:
+        return m.end() - 1  # fast path: only whitespace before the comma
+    depth = 0
+    for m in COMMA_RE.finditer(text, pos, end):
+        ch = m.group()
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            return m.start()
+    return end
+
+
+# ---------------- Entries ----------------
+def scan_entries(text: Union[str, bytes, mmap.mmap], pos: int = 0, endpos: Optional[int] = None) -> Iterator[RawEntry]:
+    """Yield every top-level entry in text[pos:endpos] in file order.
+
+    text may also be bytes or an mmap; offsets are then byte offsets (keys are still str)."""
+    syn = _syntax(text)
+    n = len(text) if endpos is None else endpos
+    while True:
+        m = syn.entry_start.search(text, pos, n)
+        if not m:
+            return
+        etype = m.group(1).lower()
+        if syn is _BYTES:
+            etype = etype.decode("ascii")
+        opener = m.end() - 1
+        close = match_brace(text, opener, n) if m.group(2) == syn.lbrace else _match_paren(text, opener, n)
+        end = min(close + 1, n)
+        key, body = "", opener + 1
+        if etype not in SPECIAL_TYPES:
+            comma = text.find(syn.comma, opener + 1, close)
+            if comma != -1:
+                key, body = text[opener + 1:comma].strip(), comma + 1
+            else:
+                key, body = text[opener + 1:close].strip(), close
+            if syn is _BYTES:
+                key = key.decode("utf-8", errors="ignore")
+        yield RawEntry(etype, key, m.start(), end, body)
+        pos = end
+
+
+def parse_fields(text: str, start: int, end: int, macros: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Parse `name = value, ...` in text[start:end] (end excludes the closing delimiter)."""
+    macros = macros or {}
+    fields: Dict[str, str] = {}
+    pos = start
+    while pos < end:
+        m = FIELD_NAME_RE.match(text, pos, end)
+        if not m:
+            pos = _next_comma(text, pos, end) + 1
+            continue
+        name, pos = m.group(1).lower(), m.end()
+        parts: List[str] = []
+        while pos < end:
+            ch = text[pos]
+            if ch == "{":
+                close = match_brace(text, pos, end)
+                parts.append(text[pos + 1:close]); pos = close + 1
+            elif ch == '"':
+                close = _match_quote(text, pos, end)
+                parts.append(text[pos + 1:close]); pos = close + 1
+            else:
+                mb = BARE_VALUE_RE.match(text, pos, end)
+                if not mb:
+                    break
+                tok = mb.group()
+                parts.append(macros.get(tok.lower(), tok)); pos = mb.end()
+            mc = CONCAT_RE.match(text, pos, end)
+            if not mc:
+                break
+            pos = mc.end()
+        fields[name] = "".join(parts).strip()
+        pos = _next_comma(text, pos, end) + 1
+    return fields
+
+
+def entry_fields(text: str, raw: RawEntry, macros: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Fields of one scanned entry (the closing delimiter is excluded)."""
+    return parse_fields(text, raw.body, raw.end - 1, macros)
+
+
+def entry_from_block(block: str, macros: Optional[Dict[str, str]] = None) -> Optional[BibEntry]:
+    """Parse a single verbatim entry block (as sliced out by scan_entries)."""
+    raw = next(scan_entries(block), None)
+    if raw is None or raw.type in SPECIAL_TYPES or not raw.key:
+        return None
+    return BibEntry(raw.type, raw.key, entry_fields(block, raw, macros))
+
+
+def entry_links(text: Union[str, bytes, mmap.mmap], raw: RawEntry) -> List[Tuple[str, str]]:
+    """(field, target key) for each LINK_FIELDS reference of a scanned entry, in LINK_FIELDS order.
+
+    A regex check over the entry body comes first, so entries without links are never parsed."""
+    if not _syntax(text).link_hint.search(text, max(raw.body - 1, raw.start), raw.end):
+        return []
+    if isinstance(text, str):
+        fields = entry_fields(text, raw)
+    else:
+        block = _decode(text[raw.start:raw.end])
+        fields = entry_fields(block, next(scan_entries(block)))
+    links: List[Tuple[str, str]] = []
+    for name in LINK_FIELDS:
+        for target in fields.get(name, "").split(","):
+            target = target.strip()
+            if target:
+                links.append((name, target))
+    return links
+
+
+def mentions_links(block: str) -> bool:
+    """Cheap pre-check: could this entry text have a LINK_FIELDS field at all?"""
+    return _STR.link_hint.search(block) is not None
+
+LINK_TARGET_RE = re.compile(r"[^,\s]+")
+LINK_VALUE_RE = re.compile(r'(,\s*(?i:%s)\s*=\s*)(?:\{([^{}]*)\}|"([^"]*)")' % "|".join(LINK_FIELDS))
+
+def rewrite_links(block: str, mapping: Dict[str, str]) -> str:
+    """block with every LINK_FIELDS target found in mapping replaced by mapping[target]
+    (e.g. an alias map, so a child follows its parent's canonical key). Other text is untouched."""
+    def sub(m: "re.Match") -> str:
+        braced = m.group(2) is not None
+        value = m.group(2) if braced else m.group(3)
+        value = LINK_TARGET_RE.sub(lambda t: mapping.get(t.group(), t.group()), value)
+        return m.group(1) + ("{%s}" % value if braced else '"%s"' % value)
+    return LINK_VALUE_RE.sub(sub, block) if mapping and mentions_links(block) else block
+
+def parse_entries(text: str) -> Dict[str, BibEntry]:
+    """Parse a whole .bib into {key: BibEntry}, expanding @string macros."""
+    entries: Dict[str, BibEntry] = {}
+    macros: Dict[str, str] = {}
+    for raw in scan_entries(text):
+        if raw.type == "string":
+            macros.update(entry_fields(text, raw, macros))
+            continue
+        if raw.type in SPECIAL_TYPES or not raw.key:
+            continue
+        entries[raw.key] = BibEntry(raw.type, raw.key, entry_fields(text, raw, macros))
+    return entries
+
+
+# ---------------- Names ----------------
+def split_top_level(text: str, sep: str = ",") -> List[str]:
+    parts, start, depth = [], 0, 0
+    for m in re.finditer("[{}" + re.escape(sep) + "]", text):
+        ch = m.group()
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth = max(0, depth-1)
+        elif depth == 0:
+            parts.append(text[start:m.start()]); start = m.end()
+    parts.append(text[start:])
+    return parts
+
+# Combining marks for BibTeX accent commands, and the letter commands.
+LATEX_ACCENTS = {"'": "\u0301", "`": "\u0300", "^": "\u0302", '"': "\u0308", "~": "\u0303", "=": "\u0304",
+                 ".": "\u0307", "u": "\u0306", "v": "\u030c", "H": "\u030b", "c": "\u0327", "k": "\u0328",
+                 "r": "\u030a"}
+LATEX_LETTERS = {"ss": "ß", "ae": "æ", "AE": "Æ", "oe": "œ", "OE": "Œ", "aa": "å", "AA": "Å",
+                 "o": "ø", "O": "Ø", "l": "ł", "L": "Ł", "i": "ı", "j": "ȷ"}
+LATEX_ACCENT_RE = re.compile(r"""\\(?:([`'^"~=.])\s*|([uvHckr])(?:\s+|(?=\{)))(?:\{\s*(\\?[A-Za-z])\s*\}|(\\?[A-Za-z]))""")
+LATEX_LETTER_RE = re.compile(r"\\(ss|ae|AE|oe|OE|aa|AA|o|O|l|L|i|j)(?![A-Za-z])\s*")
+
+def _accent(m: "re.Match") -> str:
+    letter = m.group(3) or m.group(4)
+    if letter.startswith("\\"):
+        letter = LATEX_LETTERS.get(letter[1:], letter[1:])
+        letter = {"ı": "i", "ȷ": "j"}.get(letter, letter)  # accented dotless i/j -> plain letter + mark
+    return letter + LATEX_ACCENTS[m.group(1) or m.group(2)]
+
+def normalize_name(name: str) -> str:
+    """LaTeX accents -> Unicode (NFC), braces dropped, whitespace collapsed."""
+    if "\\" in name:
+        name = LATEX_ACCENT_RE.sub(_accent, name)
+        name = LATEX_LETTER_RE.sub(lambda m: LATEX_LETTERS[m.group(1)], name)
+        name = unicodedata.normalize("NFC", name)
+    if "{" in name or "}" in name:
+        name = name.replace("{", "").replace("}", "")
+    return " ".join(name.split())
+
+def family_name(person: str) -> str:
+    """Family name of one author/editor: "Last, First", "First Last", BibLaTeX family=...,
+    or a brace-protected {Corporate Author}, kept whole."""
+    person = person.strip()
+    if "family=" in person:
+        for piece in split_top_level(person):
+            name, _, value = piece.partition("=")
+            if name.strip().lower() == "family":
+                return normalize_name(value)
+        return ""
+    if person.startswith("{") and person.endswith("}") and len(split_top_level(person, sep=" ")) == 1:
+        return normalize_name(person)
+    person = normalize_name(person)
+    if "," in person:
+        return person.split(",", 1)[0].strip()
+    parts = person.split()
+    return parts[-1] if parts else ""
+
+
+# ---------------- Writing ----------------
+def write_bib(out_path: str, selected_blocks: List[str], specials: List[str]) -> int:
+    """Write verbatim entry blocks after the (deduplicated) @string/@preamble/@comment blocks;
+    return the number of characters written."""
+    n = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        seen = set()
+        for s in specials:
+            key = s.strip()
+            if key not in seen:
+                n += f.write(s.rstrip() + "\n\n")
+                seen.add(key)
+        for b in selected_blocks:
+            n += f.write(b.rstrip() + "\n\n")
+    return n
+
+
+# ---------------- Citations ----------------
+# What a document cites, in one place: build_schedule.py expands these matches and
+# prune_bib_old.py keeps their entries, so the two can never disagree on a key.
+CITE_PATTERN = r"""
+      \\cite[A-Za-z]*\*?\s*(?:\[[^\]]*\]\s*){0,2}\{(?P<ckeys>[^}]+)\}   # \cite{a,b}, \citep[see][p. 3]{a}, \cite*{a}
+    | (?<![A-Za-z0-9_@])@(?P<key>[A-Za-z0-9_:+./-]*[A-Za-z0-9_])        # @key, without trailing punctuation
+"""
+CITE_RE = re.compile(CITE_PATTERN, re.VERBOSE)
+
+def match_keys(m: "re.Match") -> List[str]:
+    """The citekeys of one CITE_PATTERN match."""
+    if m.group("key"):
+        return [m.group("key")]
+    return [k for k in (kk.strip() for kk in m.group("ckeys").split(",")) if k]
+
+def cited_keys(text: str) -> Set[str]:
+    keys: Set[str] = set()
+    for m in CITE_RE.finditer(text):
+        keys.update(match_keys(m))
+    return keys
+
+
+# ---------------- Lazy access ----------------
+def _decode(data: bytes) -> str:
+    # same text open(..., "r", errors="ignore") would give (universal newlines)
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def build_index(data: Union[bytes, mmap.mmap]) -> Dict[str, list]:
+    """One scan over the raw bytes: {"entries": {key: (start, end)}, "strings": [(start, end), ...]}."""
+    entries: Dict[str, Tuple[int, int]] = {}
+    strings: List[Tuple[int, int]] = []
+    for raw in scan_entries(data):
+        if raw.type == "string":
+            strings.append((raw.start, raw.end))
+        elif raw.type not in SPECIAL_TYPES and raw.key:
+            entries[raw.key] = (raw.start, raw.end)
+    return {"entries": entries, "strings": strings}
+
+
+class LazyBib(Mapping):
+    """Read-only {key: entry} view of a .bib that parses entries on first access.
+
+    The file is mmapped and indexed once (build_index); pass a previously built `index`
+    to skip the scan. Materialized entries are the same BibEntry objects parse_entries() builds.
+    Safe to share between threads. close() (or a with block) releases the mapping."""
+
+    def __init__(self, path: str, index: Optional[Dict[str, list]] = None):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._data = b""
+        self.index = index if index is not None else build_index(self._data)
+        self._spans = self.index["entries"]
+        self._macro_spans = sorted(self.index["strings"])
+        self._macros: Optional[List[Tuple[int, Dict[str, str]]]] = None
+        self._macros_lock = threading.Lock()
+        self._cache: Dict[str, BibEntry] = {}
+
+    def _macro_table(self) -> List[Tuple[int, Dict[str, str]]]:
+        """(start, macros defined up to there) per @string; built once, published only when complete."""
+        with self._macros_lock:
+            if self._macros is None:
+                table, acc = [], {}
+                for start, end in self._macro_spans:
+                    text = _decode(self._data[start:end])
+                    raw = next(scan_entries(text), None)
+                    if raw is not None:
+                        acc.update(entry_fields(text, raw, acc))
+                    table.append((start, dict(acc)))
+                self._macros = table
+            return self._macros
+
+    def _macros_before(self, pos: int) -> Dict[str, str]:
+        table = self._macros if self._macros is not None else self._macro_table()
+        macros: Dict[str, str] = {}
+        for start, defined in table:
+            if start >= pos:
+                break
+            macros = defined
+        return macros
+
+    def __getitem__(self, key: str) -> BibEntry:
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        start, end = self._spans[key]
+        text = _decode(self._data[start:end])
+        raw = next(scan_entries(text))
+        macros = self._macros_before(start) if self._macro_spans else None
+        entry = self._cache[key] = BibEntry(raw.type, key, entry_fields(text, raw, macros))
+        return entry
+
+    def __contains__(self, key) -> bool:
+        return key in self._spans
+
+    def __iter__(self):
+        return iter(self._spans)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    @property
+    def parsed(self) -> int:
+        """Entries materialized so far."""
+        return len(self._cache)
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> "LazyBib":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __reduce__(self):
+        # re-open (and re-map) the file on the other side of a process pool, keeping the index
+        return LazyBib, (self.path, self.index)
+
+
+def close_bib(entries) -> None:
+    """Release what a loaded bib holds open (a LazyBib's mapping); plain dicts need nothing."""
+    close = getattr(entries, "close", None)
+    if close is not None:
+        close()
+
+
+# ---------------- Layered access ----------------
+def load_aliases(path: str) -> Dict[str, str]:
+    """{alias key: canonical key} from a JSON alias map (merge_bibs.py --aliases-out)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, str) for v in data.values()):
+        raise ValueError(f"alias map must be a JSON object of key -> key: {path}")
+    return data
+
+Layer = Union[Mapping, Callable[[], Mapping]]  # a {key: BibEntry} mapping, or a loader returning one
+
+class LayeredBib(Mapping):
+    """Read-only {key: BibEntry} view over several bibs in priority order.
+
+    A key resolves from the first layer that has it. Layers given as loaders are called
+    only when every layer above them lacks a looked-up key (or when the view is iterated),
+    so a lower-priority library is never read while the higher ones cover the citations.
+    aliases maps alternative citekeys to canonical ones (merge_bibs.py): an alias resolves
+    to its canonical key's entry, and canonical() names that key."""
+
+    def __init__(self, layers: Sequence[Layer], aliases: Optional[Dict[str, str]] = None):
+        self._layers: List[Layer] = list(layers)
+        self._loaded = 0
+        self._load_lock = threading.Lock()
+        self.aliases: Dict[str, str] = dict(aliases or {})
+
+    def _layer(self, i: int) -> Mapping:
+        layer = self._layers[i]
+        if not isinstance(layer, Mapping):
+            with self._load_lock:  # one thread runs the loader; the others wait for its result
+                layer = self._layers[i]
+                if not isinstance(layer, Mapping):
+                    layer = layer()
+                    self._layers[i] = layer
+        if self._loaded <= i:
+            with self._load_lock:
+                self._loaded = max(self._loaded, i + 1)
+        return layer
+
+    def _find(self, key: str) -> Optional[BibEntry]:
+        for i in range(len(self._layers)):
+            layer = self._layer(i)
+            if key in layer:
+                return layer[key]
+        return None
+
+    def canonical(self, key: str) -> str:
+        return self.aliases.get(key, key)
+
+    def __getitem__(self, key: str) -> BibEntry:
+        entry = self._find(self.canonical(key))
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __contains__(self, key) -> bool:
+        return self._find(self.canonical(key)) is not None
+
+    def __iter__(self):
+        seen = set()
+        for i in range(len(self._layers)):
+            for key in self._layer(i):
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    @property
+    def layers(self) -> List[Mapping]:
+        """The layers loaded so far, highest priority first."""
+        return [self._layers[i] for i in range(self._loaded)]
+
+    @property
+    def parsed(self) -> int:
+        """Entries materialized so far by lazily parsed (LazyBib) layers."""
+        return sum(layer.parsed for layer in self.layers if isinstance(layer, LazyBib))
+
+    def close(self) -> None:
+        for layer in self.layers:
+            close_bib(layer)
+
+    def __reduce__(self):
+        # unloaded layers travel as their loaders, so those must be picklable (functools.partial)
+        return LayeredBib, (self._layers, self.aliases)
+
+
+# ---------------- Resident (long-running) access ----------------
+class ResidentBib(Mapping):
+    """{key: BibEntry} kept in memory across edits of one file (see build_schedule --watch).
+
+    update(text) re-scans the text (cheap) but re-parses only entries whose block text, or
+    number of @string blocks above them (which decides the macros in scope), changed since
+    the previous update; if any @string definition changed, everything is re-parsed, since
+    macro values may have moved."""
+
+    def __init__(self, text: str = ""):
+        self.entries: Dict[str, BibEntry] = {}
+        self._blocks: Dict[str, Tuple[str, int]] = {}  # key -> (block text, @strings before it)
+        self._strings: Tuple[str, ...] = ()
+        if text:
+            self.update(text)
+
+    def update(self, text: str) -> int:
+        """Refresh from the file's new text; return the number of entries (re-)parsed."""
+        raws = list(scan_entries(text))
+        strings = tuple(text[r.start:r.end] for r in raws if r.type == "string")
+        reuse = strings == self._strings
+        entries: Dict[str, BibEntry] = {}
+        blocks: Dict[str, Tuple[str, int]] = {}
+        macros: Dict[str, str] = {}
+        parsed = n_strings = 0
+        for raw in raws:
+            if raw.type == "string":
+                macros.update(entry_fields(text, raw, macros))
+                n_strings += 1
+                continue
+            if raw.type in SPECIAL_TYPES or not raw.key:
+                continue
+            block = (text[raw.start:raw.end], n_strings)
+            old = self.entries.get(raw.key)
+            if reuse and old is not None and self._blocks.get(raw.key) == block:
+                entries[raw.key] = old
+            else:
+                entries[raw.key] = BibEntry(raw.type, raw.key, entry_fields(text, raw, macros))
+                parsed += 1
+            blocks[raw.key] = block
+        self.entries, self._blocks, self._strings = entries, blocks, strings
+        return parsed
+
+    def __getitem__(self, key: str) -> BibEntry:
+        return self.entries[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
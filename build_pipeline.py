@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+build_pipeline.py
+
+Runs the `make expand` steps as a dependency graph:
+
+    render_pdf -> copy_pdf
+    export_schedule ─┐
+    copy_bib ────────┴-> build_schedule
+
+- Every stage records a stamp (sha256 of its command, input files and output files) in
+  .cache/pipeline-stamps.json; a stage whose stamp still matches is skipped. File hashes are
+  reused while size and mtime are unchanged (.cache/pipeline-stat-index.json), so a no-op run
+  only stats files.
+- Stages run as soon as their dependencies finish, so the R/PDF render overlaps with the
+  schedule export and build.
+- Stages marked optional (everything before build_schedule, as with make's `-` prefix) may fail
+  or lack inputs without stopping the build; dependents then use whatever files exist.
+- Prints per-stage status/timings and the critical path.
+
+    python build_pipeline.py                 # what `make expand` does
+    python build_pipeline.py --force --jobs 1
+"""
+import argparse, hashlib, json, os, subprocess, sys, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+import build_schedule
+import buildcache
+
+STAMPS = "pipeline-stamps.json"
+STAT_INDEX = "pipeline-stat-index.json"  # not build_schedule.py's index: that runs as a subprocess meanwhile
+
+class Stage(NamedTuple):
+    name: str
+    cmd: List[str]
+    inputs: List[str]
+    outputs: List[str]
+    deps: List[str] = []
+    stdout: Optional[str] = None   # write the command's stdout here (only if it changed)
+    optional: bool = False         # failure/missing inputs only warn, like make's `-` prefix
+
+class Result(NamedTuple):
+    status: str    # ran | skipped | failed | missing
+    seconds: float
+    detail: str = ""
+    stamp: Optional[str] = None   # new stamp to record (set when the stage ran)
+
+# ---------------- Graph ----------------
+def expand_stages(syllabus_dir: str, bib: str, sched_in: str, sched_out: str, start: str, refs: str,
+                  static_dir: str = "static") -> List[Stage]:
+    """The stages of the Makefile's `expand` target."""
+    rmd = os.path.join(syllabus_dir, "grad_methods_syllabus.Rmd")
+    pdf = os.path.join(syllabus_dir, "grad_methods_syllabus.pdf")
+    src_bib = os.path.join(syllabus_dir, os.path.basename(bib))
+    # shortcode pages read their references from Hugo's data/refs.json, which the build also writes
+    built = [sched_out] + ([build_schedule.HUGO_DATA_PATH] if refs == "shortcode" else [])
+    py = sys.executable
+    return [
+        Stage("render_pdf", ["Rscript", "-e", f"rmarkdown::render('{rmd}', output_format = 'pdf_document')"],
+              [rmd], [pdf], optional=True),
+        Stage("copy_pdf", ["cp", pdf, static_dir + "/"], [pdf], [os.path.join(static_dir, os.path.basename(pdf))],
+              ["render_pdf"], optional=True),
+        Stage("export_schedule", [py, "export_syllabus_from_markdown.py", rmd, "--region", f"schedule={sched_in}"],
+              [rmd, "export_syllabus_from_markdown.py"], [sched_in], optional=True),
+        Stage("copy_bib", ["cp", src_bib, os.path.dirname(bib)], [src_bib], [bib], optional=True),
+        Stage("build_schedule", [py, "build_schedule.py", "--in", sched_in, "--out", sched_out, "--bib", bib,
+                                 "--start", start, "--refs", refs],
+              [sched_in, bib, "build_schedule.py", "bibtools.py", "buildcache.py", "buildtimings.py",
+               "keysuggest.py", "termcalendar.py"], built,
+              ["export_schedule", "copy_bib"]),
+    ]
+
+def topo_order(stages: List[Stage]) -> List[Stage]:
+    """Stages with every dependency before its dependents; rejects unknown deps and cycles."""
+    names = {s.name for s in stages}
+    for s in stages:
+        for d in s.deps:
+            if d not in names:
+                raise SystemExit(f"[error] stage {s.name} depends on unknown stage {d}")
+    order: List[Stage] = []
+    done: set = set()
+    pending = list(stages)
+    while pending:
+        ready = [s for s in pending if all(d in done for d in s.deps)]
+        if not ready:
+            raise SystemExit(f"[error] dependency cycle among: {', '.join(s.name for s in pending)}")
+        order += ready
+        done.update(s.name for s in ready)
+        pending = [s for s in pending if s.name not in done]
+    return order
+
+# ---------------- Stamps ----------------
+def file_digest(path: str, cache_dir: str) -> Optional[str]:
+    return buildcache.file_digest(path, cache_dir, index=STAT_INDEX) if os.path.isfile(path) else None
+
+def stage_stamp(stage: Stage, cache_dir: str) -> Optional[str]:
+    """Hash of command + inputs + outputs; None when an input or output is missing."""
+    files = {}
+    for p in stage.inputs + stage.outputs:
+        digest = file_digest(p, cache_dir)
+        if digest is None:
+            return None
+        files[p] = digest
+    payload = json.dumps([stage.cmd, stage.stdout, sorted(files.items())])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_stamps(cache_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(cache_dir, STAMPS), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# ---------------- Run ----------------
+def run_stage(stage: Stage, prior: Optional[str], cache_dir: str, force: bool) -> Result:
+    t0 = time.perf_counter()
+    missing = [p for p in stage.inputs if not os.path.isfile(p)]
+    if missing:
+        return Result("missing", 0.0, f"input not found: {missing[0]}")
+    if not force and prior is not None and stage_stamp(stage, cache_dir) == prior:
+        return Result("skipped", time.perf_counter() - t0)
+    try:
+        proc = subprocess.run(stage.cmd, capture_output=True, text=True)
+    except OSError as e:
+        return Result("failed", time.perf_counter() - t0, str(e))
+    if proc.returncode != 0:
+        return Result("failed", time.perf_counter() - t0, (proc.stderr or proc.stdout).strip()[-500:])
+    if stage.stdout:
+        buildcache.write_text_if_changed(stage.stdout, proc.stdout)
+    elif proc.stdout.strip():
+        print(proc.stdout.rstrip())
+    return Result("ran", time.perf_counter() - t0, stamp=stage_stamp(stage, cache_dir))
+
+def run_pipeline(stages: List[Stage], cache_dir: str = buildcache.CACHE_DIR, jobs: Optional[int] = None,
+                 force: bool = False) -> Dict[str, Result]:
+    """Run stages in dependency order, independent ones concurrently; return {name: Result}."""
+    optional = {s.name: s.optional for s in topo_order(stages)}
+    stamps = load_stamps(cache_dir)
+    results: Dict[str, Result] = {}
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs or len(stages)) as pool:
+        while pending or running:
+            for s in [s for s in pending if all(d in results for d in s.deps)]:
+                pending.remove(s)
+                failed = [d for d in s.deps if not ok(results[d], optional[d])]
+                if failed:
+                    results[s.name] = Result("failed", 0.0, f"dependency failed: {failed[0]}")
+                    continue
+                running[pool.submit(run_stage, s, stamps.get(s.name), cache_dir, force)] = s
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                s = running.pop(fut)
+                results[s.name] = fut.result()
+                if results[s.name].stamp is not None:
+                    stamps[s.name] = results[s.name].stamp
+    buildcache.atomic_write_bytes(os.path.join(cache_dir, STAMPS), json.dumps(stamps, indent=1, sort_keys=True).encode("utf-8"))
+    return results
+
+def ok(result: Result, optional: bool) -> bool:
+    return optional or result.status in ("ran", "skipped")
+
+# ---------------- Report ----------------
+def critical_path(stages: List[Stage], results: Dict[str, Result]) -> List[str]:
+    """Chain of stages with the largest summed run time."""
+    best: Dict[str, float] = {}
+    prev: Dict[str, Optional[str]] = {}
+    for s in topo_order(stages):
+        up = max(s.deps, key=lambda d: best[d], default=None)
+        best[s.name] = results[s.name].seconds + (best[up] if up else 0.0)
+        prev[s.name] = up
+    node: Optional[str] = max(best, key=best.get)
+    path = []
+    while node:
+        path.append(node)
+        node = prev[node]
+    return path[::-1]
+
+def report(stages: List[Stage], results: Dict[str, Result], total: float) -> None:
+    for s in stages:
+        r = results[s.name]
+        tag = "[done]" if r.status in ("ran", "skipped") else "[warn]" if s.optional else "[error]"
+        detail = f": {r.detail}" if r.detail else ""
+        print(f"{tag} {s.name:<16} {r.status:<8} {r.seconds * 1000:9.1f} ms{detail}")
+    path = critical_path(stages, results)
+    cp = sum(results[n].seconds for n in path)
+    print(f"[pipeline] critical path {' -> '.join(path)}: {cp * 1000:.1f} ms; wall {total * 1000:.1f} ms")
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the expand pipeline (PDF render, schedule export, bib copy, build) as a DAG, skipping unchanged stages.")
+    ap.add_argument("--syllabus-dir", default="../markdown_syllabus_grad_methods", help="Directory with grad_methods_syllabus.Rmd and the master .bib")
+    ap.add_argument("--bib", default="content/bib/grad_methods.bib", help="Site copy of the .bib (default content/bib/grad_methods.bib)")
+    ap.add_argument("--sched-in", default="content/schedule_bib.md", help="Exported schedule (default content/schedule_bib.md)")
+    ap.add_argument("--sched-out", default="content/schedule.md", help="Built schedule (default content/schedule.md)")
+    ap.add_argument("--start", default="2026-01-21", help="Start Wednesday YYYY-MM-DD (default 2026-01-21)")
+    ap.add_argument("--refs", default="inline", help="build_schedule.py --refs mode (default inline)")
+    ap.add_argument("--cache-dir", default=buildcache.CACHE_DIR, help="Where stamps are kept (default .cache)")
+    ap.add_argument("--jobs", type=int, help="Stages run at once (default: all that are ready)")
+    ap.add_argument("--force", action="store_true", help="Run every stage even if its stamp matches")
+    args = ap.parse_args()
+
+    stages = expand_stages(args.syllabus_dir, args.bib, args.sched_in, args.sched_out, args.start, args.refs)
+    t0 = time.perf_counter()
+    results = run_pipeline(stages, args.cache_dir, args.jobs, args.force)
+    report(stages, results, time.perf_counter() - t0)
+    sys.exit(0 if all(ok(results[s.name], s.optional) for s in stages) else 1)
+
+if __name__ == "__main__":
+    main()
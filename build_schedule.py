@@ -6,8 +6,37 @@ build_schedule.py (v13)
     * legacy: `r advdate(wed, 2)` or advdate(wed, 2) (Wednesdays), starting from --start
     * new: `r advdate(lecture, 2)` / `r advdate(section, 2)` (Wednesdays/Mondays), using base dates
       parsed from the markdown (lecture <- as.Date("YYYY-MM-DD"), section <- as.Date("YYYY-MM-DD")).
+    * macros are looked up in a per-run calendar table (termcalendar.py) that honours skipped
+      weeks and holidays (skip_weeks <- / holidays <- in the markdown, --skip-week/--holiday);
+      --calendar-out exports the sessions as iCalendar or JSON.
 - Replaces @keys with clickable/hoverable popovers containing APA-style HTML
   references (DOI/URL clickable) and a "Copy reference" button (plain-text APA).
+- Reference payload modes (--refs):
+    * inline: every anchor carries the full data-ref/data-plain copy (default)
+    * table: anchors carry only data-key; each cited reference is emitted once in
+      a <script type="application/json" class="cite-refs"> block at the end of the page
+    * shortcode: citations become {{< cite "key" >}}, resolved by Hugo against the
+      data/refs.json table written by --hugo-data (layouts/shortcodes/cite.html)
+- --hugo-data writes the formatted references of the cited (or all) entries to Hugo's data/
+  directory as sorted JSON, rewritten only when its bytes change.
+- Also expands \\cite{K1,K2} (and \\citet/\\citep/... variants, with optional [..] args)
+  into "(anchor; anchor)".
+- Dates and citations are expanded in a single streaming pass (transform_chunks).
+- Several --in/--out pairs (or --manifest) build many documents against one bib load,
+  in a process or thread pool.
+- --watch keeps the parsed bib and formatted references in memory and rebuilds
+  whenever an input or the bib changes.
+- --lazy indexes the .bib (citekey -> byte span) instead of parsing it, and formats only
+  the entries the document cites.
+- --timings/--profile report per-stage wall time (and tracemalloc allocations) plus
+  counters; --cprofile STAGE dumps a cProfile of one stage.
+- Author names: LaTeX accents (\\"o, {\\'e}, \\ss, ...) become Unicode and braces are dropped;
+  brace-protected corporate authors ({PRISMA-P Group}) are kept whole. Parsed names and whole
+  author fields are memoized in bounded LRU caches (--author-cache).
+- --check-links checks the DOI/URL links of every cited reference (linkcheck.py: concurrent,
+  per-host rate limited, cached with a TTL) and reports dead or moved ones.
+- SchedulePipeline renders markdown text (or file objects) against a bib held in memory, for
+  use as a library; schedule_server.py serves it over HTTP.
 - In-text citation label is APA-style: "Author (Year)".
 - Year handling:
     * "YYYY-MM" or "YYYY-MM-DD" -> "YYYY"
@@ -16,12 +45,20 @@ build_schedule.py (v13)
 - Popover HTML includes a publication container (journal/booktitle/publisher/
   howpublished/institution/organization/school/series/eprinttype or URL host).
 """
-import argparse, re, os, unicodedata, html
-from typing import Dict, Tuple, List, Set
+import argparse, re, os, unicodedata, html, json, hashlib, time, functools, io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Tuple, List, Set, Optional, Iterator, Union, TextIO, Sequence
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from urllib.parse import urlparse
 
+import bibtools
+import buildcache
+import buildtimings
+import keysuggest
+import termcalendar
+from bibtools import normalize_name, split_top_level  # shared with merge_bibs.py
+
 # ---------------- Utilities ----------------
 def slugify_id(s: str) -> str:
     s = unicodedata.normalize("NFKD", s)
@@ -33,70 +70,20 @@ def slugify_id(s: str) -> str:
 def strip_title_braces(title: str) -> str:
     return title.replace("{", "").replace("}", "")
 
-def split_top_level(text: str, sep: str = ",") -> List[str]:
-    parts, buf, depth = [], [], 0
-    for ch in text:
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth = max(0, depth-1)
-        if ch == sep and depth == 0:
-            parts.append("".join(buf)); buf = []
-        else:
-            buf.append(ch)
-    parts.append("".join(buf))
-    return parts
-
 # ---------------- .bib parsing ----------------
-def parse_bib(bib_text: str) -> Dict[str, Dict]:
-    entries = {}
-    i, n = 0, len(bib_text)
-    while True:
-        at = bib_text.find("@", i)
-        if at == -1: break
-        j = at+1
-        while j < n and bib_text[j].isalpha(): j += 1
-        etype = bib_text[at+1:j].lower()
-        while j < n and bib_text[j] != "{": j += 1
-        if j >= n: break
-        start = j; depth = 0; k = j
-        while k < n:
-            ch = bib_text[k]
-            if ch == "{": depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    k += 1; break
-            k += 1
-        block = bib_text[at:k]; i = k
-        try:
-            brace = block.find("{"); comma = block.find(",", brace+1)
-            key = block[brace+1:comma].strip()
-        except Exception:
-            continue
-        fields = {}
-        rest = block[comma+1:].strip()
-        if rest.endswith("}"): rest = rest[:-1]
-        for pair in split_top_level(rest, sep=","):
-            if "=" not in pair: continue
-            name, val = pair.split("=", 1)
-            name = name.strip().lower(); val = val.strip().strip(",").strip()
-            if val.startswith("{") and val.endswith("}"):
-                val = val[1:-1].strip()
-            elif val.startswith('"') and val.endswith('"'):
-                val = val[1:-1].strip()
-            fields[name] = val
-        entries[key] = {"type": etype, "key": key, "fields": fields}
-    return entries
+def parse_bib(bib_text: str) -> Dict[str, bibtools.BibEntry]:
+    return bibtools.parse_entries(bib_text)
 
 # ---------------- Authors ----------------
+AUTHOR_CACHE_SIZE = 4096
+
 def parse_structured_author(token: str):
     """family=Maas, given=Han L. J., prefix=van der, useprefix=true"""
     attrs = {}
     for piece in split_top_level(token, sep=","):
         if "=" in piece:
             k, v = piece.split("=", 1)
-            attrs[k.strip().lower()] = v.strip()
+            attrs[k.strip().lower()] = normalize_name(v)
     family = attrs.get("family", "").strip()
     given = attrs.get("given", "").strip()
     prefix = attrs.get("prefix", "").strip()
@@ -108,10 +95,14 @@ def parse_structured_author(token: str):
         full_apa = f"{prefix} {full_apa}"
     return last_for_intext.strip(), full_apa.strip()
 
-def parse_person(token: str):
+def _parse_person(token: str):
     token = token.strip()
     if "family=" in token and "given=" in token:
         return parse_structured_author(token)
+    if token.startswith("{") and token.endswith("}") and len(split_top_level(token, sep=" ")) == 1:
+        name = normalize_name(token)  # {PRISMA-P Group}: corporate author, never split or abbreviated
+        return name, name
+    token = normalize_name(token)
     if "," in token:
         last, firsts = [x.strip() for x in token.split(",", 1)]
     else:
@@ -119,7 +110,7 @@ def parse_person(token: str):
     initials = " ".join([p[0] + "." for p in firsts.split() if p])
     return last, f"{last}, {initials}".strip().rstrip(",")
 
-def format_authors(author_field: str) -> Tuple[str, str]:
+def _format_authors(author_field: str) -> Tuple[str, str]:
     raw = [a.strip() for a in author_field.split(" and ") if a.strip()]
     last_names, full_list = [], []
     for tok in raw:
@@ -138,8 +129,27 @@ def format_authors(author_field: str) -> Tuple[str, str]:
     else: full_authors=", ".join(full_list[:-1]) + f", & {full_list[-1]}"
     return in_author, full_authors
 
+# The same people recur across a library, so both the per-name parse (including the LaTeX
+# normalization) and whole author fields are memoized; results are immutable tuples.
+def set_author_cache_size(maxsize: int) -> None:
+    """(Re)create the parse_person/format_authors LRU caches with room for maxsize items each."""
+    global parse_person, format_authors
+    parse_person = functools.lru_cache(maxsize=maxsize)(_parse_person)
+    format_authors = functools.lru_cache(maxsize=maxsize)(_format_authors)
+
+def author_cache_stats() -> Dict[str, int]:
+    person, field = parse_person.cache_info(), format_authors.cache_info()
+    return {"author_name_hits": person.hits, "author_name_misses": person.misses,
+            "author_field_hits": field.hits, "author_field_misses": field.misses}
+
+set_author_cache_size(AUTHOR_CACHE_SIZE)
+
 # ---------------- APA-ish formatter ----------------
-def format_year(fields: Dict[str,str]) -> str:
+# bump whenever apa_html_and_plain output changes, so cached references (buildcache.RefStore) are dropped
+FORMATTER_VERSION = 2
+
+def format_year(fields) -> str:
+    """fields: a BibEntry or any {name: value} mapping."""
     y = (fields.get("year") or fields.get("date") or "").strip()
     if y:
         y_clean = y.replace("{","").replace("}","").strip()
@@ -161,14 +171,20 @@ def format_year(fields: Dict[str,str]) -> str:
         if m2: return m2.group(1)
     return "n.d."
 
-def apa_html_and_plain(entry: Dict) -> Tuple[str, str, str]:
-    f = entry["fields"]; et = entry["type"]
+def entry_link(fields) -> str:
+    """The link a reference shows: its DOI as a doi.org URL, else its url field ("" if neither)."""
+    doi = fields.get("doi", "").strip()
+    if doi:
+        return "https://doi.org/" + doi.lstrip("https://doi.org/")
+    return fields.get("url", "").strip()
+
+def apa_html_and_plain(entry: bibtools.BibEntry) -> Tuple[str, str, str]:
+    f = entry; et = entry.type
     authors = f.get("author", "")
     in_author, full_authors = format_authors(authors) if authors else ("", "")
     year = format_year(f)
     title = strip_title_braces(f.get("title", "").rstrip("."))
 
-    doi = f.get("doi", "").strip()
     url = f.get("url", "").strip()
     pages = f.get("pages", "").replace("--", "–")
     volume = f.get("volume", "")
@@ -242,13 +258,10 @@ def apa_html_and_plain(entry: Dict) -> Tuple[str, str, str]:
     if container:
         # strip tags for plain
         parts_html.append(container); parts_plain.append(re.sub(r"<[^>]+>", "", container))
-    if doi:
-        doi_url = "https://doi.org/" + doi.lstrip("https://doi.org/")
-        parts_html.append(f'<a href="{html.escape(doi_url)}" target="_blank" rel="noopener">{html.escape(doi_url)}</a>')
-        parts_plain.append(doi_url)
-    elif url:
-        parts_html.append(f'<a href="{html.escape(url)}" target="_blank" rel="noopener">{html.escape(url)}</a>')
-        parts_plain.append(url)
+    link = entry_link(f)
+    if link:
+        parts_html.append(f'<a href="{html.escape(link)}" target="_blank" rel="noopener">{html.escape(link)}</a>')
+        parts_plain.append(link)
 
     full_html = " ".join(p for p in parts_html if p and p.strip())
     full_plain = " ".join(p for p in parts_plain if p and p.strip())
@@ -258,34 +271,51 @@ def apa_html_and_plain(entry: Dict) -> Tuple[str, str, str]:
     return intext, full_html, full_plain
 
 # ---------------- Citation expansion ----------------
-CITE_RE = re.compile(r"(?<![A-Za-z0-9_@])@([A-Za-z0-9_:+./-]+)")
-
 def collect_keys(md: str) -> Set[str]:
-    return set(m.group(1) for m in CITE_RE.finditer(md))
-
-def inject_popovers(md: str, citations: Dict[str, Tuple[str,str,str]]) -> str:
-    def repl(m):
-        key = m.group(1)
-        if key not in citations: return m.group(0)
-        intext, full_html, plain = citations[key]
-        data_ref = html.escape(full_html, quote=True)
-        data_plain = html.escape(plain, quote=True)
-        return f'<a href="javascript:void(0)" class="cite-pop" role="button" tabindex="0" data-ref="{data_ref}" data-plain="{data_plain}">{intext}</a>'
-    md = CITE_RE.sub(repl, md)
-    # \cite{K1,K2} style
-    def repl_cite(m):
-        keys = [kk.strip() for kk in m.group(1).split(",")]
-        pieces = []
-        for k in keys:
-            if k in citations:
-                intext, full_html, plain = citations[k]
-                data_ref = html.escape(full_html, quote=True)
-                data_plain = html.escape(plain, quote=True)
-                pieces.append(f'<a href="javascript:void(0)" class="cite-pop" role="button" tabindex="0" data-ref="{data_ref}" data-plain="{data_plain}">{intext}</a>')
-            else:
-                pieces.append(k)
-        return "(" + "; ".join(pieces) + ")"
-    md = re.sub(r"\\cite[t|p|year|author]*\\s*\\{([^}]+)\\}", repl_cite, md)
+    return bibtools.cited_keys(md)
+
+def format_citations(keys: Set[str], entries: Dict[str, bibtools.BibEntry],
+                     store: "buildcache.RefStore" = None) -> Dict[str, Tuple[str,str,str]]:
+    citations: Dict[str, Tuple[str,str,str]] = {}
+    for k in sorted(keys):
+        e = entries.get(k)
+        if not e: continue
+        citations[k] = format_citation(e, store)
+    return citations
+
+def format_citation(entry: bibtools.BibEntry, store: "buildcache.RefStore" = None) -> Tuple[str,str,str]:
+    ref = store.get(entry) if store is not None else None
+    if ref is None:
+        ref = apa_html_and_plain(entry)
+        if store is not None: store.put(entry, ref)
+    return ref
+
+REFS_MODES = ("inline", "table", "shortcode")
+
+def cite_anchor(key: str, citation: Tuple[str,str,str], refs: str = "inline") -> str:
+    intext, full_html, plain = citation
+    if refs == "shortcode":
+        return f'{{{{< cite "{key}" >}}}}'
+    if refs == "table":
+        return f'<a href="javascript:void(0)" class="cite-pop" role="button" tabindex="0" data-key="{html.escape(key, quote=True)}">{intext}</a>'
+    data_ref = html.escape(full_html, quote=True)
+    data_plain = html.escape(plain, quote=True)
+    return f'<a href="javascript:void(0)" class="cite-pop" role="button" tabindex="0" data-ref="{data_ref}" data-plain="{data_plain}">{intext}</a>'
+
+def refs_table_block(citations: Dict[str, Tuple[str,str,str]]) -> str:
+    """One JSON table {key: [html, plain]} for the popover script to resolve data-key against."""
+    table = {k: [citations[k][1], citations[k][2]] for k in sorted(citations)}
+    payload = json.dumps(table, ensure_ascii=False, separators=(",", ":"))
+    # keep "</script>" (and "<!--") from terminating the block early
+    payload = payload.replace("</", "<\\/").replace("<!--", "<\\u0021--")
+    return f'<script type="application/json" class="cite-refs">{payload}</script>'
+
+def inject_popovers(md: str, citations: Dict[str, Tuple[str,str,str]], refs: str = "inline") -> str:
+    return "".join(transform_chunks(md, None, citations.get, refs, dates=False))
+
+def append_refs_table(md: str, used: Dict[str, Tuple[str,str,str]]) -> str:
+    if used:
+        md = md.rstrip("\n") + "\n\n" + refs_table_block(used) + "\n"
     return md
 
 # ---------------- Date preprocessor ----------------
@@ -295,17 +325,7 @@ def inject_popovers(md: str, citations: Dict[str, Tuple[str,str,str]]) -> str:
 #   `r advdate(section, 2)`      (new; Mondays)
 #
 # Also support bare: advdate(...)
-
-# --- legacy (still supported) ---
-DATE_INLINE_WED = re.compile(r"`r\s+advdate\s*\(\s*wed\s*,\s*(\d+)\s*\)`", re.IGNORECASE)
-DATE_BARE_WED   = re.compile(r"\badvdate\s*\(\s*wed\s*,\s*(\d+)\s*\)", re.IGNORECASE)
-
-# --- new (lecture/section) ---
-DATE_INLINE_LECTURE = re.compile(r"`r\s+advdate\s*\(\s*lecture\s*,\s*(\d+)\s*\)`", re.IGNORECASE)
-DATE_BARE_LECTURE   = re.compile(r"\badvdate\s*\(\s*lecture\s*,\s*(\d+)\s*\)", re.IGNORECASE)
-
-DATE_INLINE_SECTION = re.compile(r"`r\s+advdate\s*\(\s*section\s*,\s*(\d+)\s*\)`", re.IGNORECASE)
-DATE_BARE_SECTION   = re.compile(r"\badvdate\s*\(\s*section\s*,\s*(\d+)\s*\)", re.IGNORECASE)
+# (The patterns live in MACRO_RE below, which also matches citations.)
 
 # CHANGE: parse lecture/section base dates directly from the markdown when present
 BASE_DATE_LECTURE = re.compile(
@@ -317,21 +337,6 @@ BASE_DATE_SECTION = re.compile(
     re.IGNORECASE | re.MULTILINE,
 )
 
-def format_date_from_n(n: int, start_dt: datetime) -> str:
-    """Legacy formatter for advdate(wed, n): full 'Week n (Wednesday, Month Day, Year)'."""
-    dt = start_dt + timedelta(days=7*(n-1))
-    pretty = dt.strftime("%A, %B ") + str(dt.day) + dt.strftime(", %Y")
-    return f"Week {n} ({pretty})"
-
-# CHANGE: new formatters to mirror the Rmd's advdate() helper (mm/dd + fixed weekday labels)
-def _format_lecture_from_n(n: int, lecture_dt: datetime) -> str:
-    dt = lecture_dt + timedelta(days=7*(n-1))
-    return f"Week {n:02d}, Wednesday, {dt.strftime('%m/%d')}"
-
-def _format_section_from_n(n: int, section_dt: datetime) -> str:
-    dt = section_dt + timedelta(days=7*(n-1))
-    return f"Section: Monday, {dt.strftime('%m/%d')}"
-
 # CHANGE: extract base dates from markdown (fallbacks preserve old CLI behavior)
 def _extract_base_dates(md: str, start_dt: datetime) -> Tuple[datetime, datetime]:
     """Return (lecture_dt, section_dt) datetimes with tzinfo.
@@ -357,52 +362,721 @@ def _extract_base_dates(md: str, start_dt: datetime) -> Tuple[datetime, datetime
 
     return lecture_dt, section_dt
 
-def preprocess_dates(md: str, start_dt: datetime) -> str:
+def term_calendar(md: str, start_dt: datetime, term: Optional[termcalendar.TermDates] = None) -> termcalendar.Calendar:
+    """The calendar table for md: its base dates (see _extract_base_dates) and skipped weeks/holidays,
+    declared in md and/or given as term. Built once per distinct set of dates (get_calendar)."""
     lecture_dt, section_dt = _extract_base_dates(md, start_dt)
+    declared = termcalendar.parse_declarations(md)
+    if term is not None and any(term):
+        declared = declared.merged(term)
+    return termcalendar.get_calendar(lecture_dt.date(), section_dt.date(), start_dt.date(), declared)
 
-    # CHANGE: expand new lecture/section shortcodes
-    md = DATE_INLINE_LECTURE.sub(lambda m: _format_lecture_from_n(int(m.group(1)), lecture_dt), md)
-    md = DATE_BARE_LECTURE.sub(lambda m: _format_lecture_from_n(int(m.group(1)), lecture_dt), md)
-    md = DATE_INLINE_SECTION.sub(lambda m: _format_section_from_n(int(m.group(1)), section_dt), md)
-    md = DATE_BARE_SECTION.sub(lambda m: _format_section_from_n(int(m.group(1)), section_dt), md)
+def preprocess_dates(md: str, start_dt: datetime, calendar: Optional[termcalendar.Calendar] = None) -> str:
+    """Expand advdate macros. `calendar` overrides the one built from md, for callers that
+    transform a document piecewise."""
+    return "".join(transform_chunks(md, start_dt, None, calendar=calendar))
 
-    # legacy: keep supporting wed shortcodes
-    md = DATE_INLINE_WED.sub(lambda m: format_date_from_n(int(m.group(1)), start_dt), md)
-    md = DATE_BARE_WED.sub(lambda m: format_date_from_n(int(m.group(1)), start_dt), md)
+# ---------------- Fused transformer ----------------
+# One scan over the markdown recognizes every macro kind; output is produced as a stream of
+# chunks (untouched text between matches + replacements), so no intermediate copies are made.
+MACRO_RE = re.compile(r"""
+      (?i: `r\s+advdate\s*\(\s*(?P<ikind>lecture|section|wed)\s*,\s*(?P<inum>\d+)\s*\)`
+         | \badvdate\s*\(\s*(?P<bkind>lecture|section|wed)\s*,\s*(?P<bnum>\d+)\s*\) )
+    |""" + bibtools.CITE_PATTERN, re.VERBOSE)  # citations: the pattern prune_bib_old.py uses too
 
-    return md
+Citation = Tuple[str, str, str]
+
+def canonical_key(entries, key: str) -> str:
+    """The key a citation is filed under: alias keys of a LayeredBib map to their canonical key."""
+    canonical = getattr(entries, "canonical", None)
+    return canonical(key) if canonical is not None else key
+
+class CitationResolver:
+    """Formats cited entries on first use (through the RefStore when given) and records every
+    key looked up, resolvable or not. Citations are filed under canonical keys, so an alias and
+    its canonical key share one reference."""
+
+    def __init__(self, entries: Dict[str, bibtools.BibEntry], store: "buildcache.RefStore" = None,
+                 timings: buildtimings.Timings = buildtimings.NULL_TIMINGS):
+        self.entries = entries
+        self.store = store
+        self.timings = timings
+        self.citations: Dict[str, Citation] = {}
+        self.seen: Set[str] = set()
+        self._canonical = getattr(entries, "canonical", None)
+
+    def canonical(self, key: str) -> str:
+        return self._canonical(key) if self._canonical is not None else key
+
+    @property
+    def missing(self) -> Set[str]:
+        """Keys looked up that did not resolve."""
+        return {k for k in self.seen if self.canonical(k) not in self.citations}
+
+    def __call__(self, key: str) -> Optional[Citation]:
+        self.seen.add(key)
+        key = self.canonical(key)
+        ref = self.citations.get(key)
+        if ref is None:
+            e = self.entries.get(key)
+            if not e: return None
+            with self.timings.stage("format"):
+                ref = self.citations[key] = format_citation(e, self.store)
+        return ref
+
+def transform_chunks(md: str, start_dt: Optional[datetime], resolve=None, refs: str = "inline",
+                     calendar: Optional[termcalendar.Calendar] = None,
+                     dates: bool = True, table: bool = True) -> Iterator[str]:
+    """Yield the transformed document in chunks.
+
+    - dates: expand advdate macros (start_dt/calendar as in preprocess_dates)
+    - resolve: key -> citation or None; when given, @key and \\cite{...} become popover anchors
+      (filed under resolve.canonical(key) when it has that method, e.g. a CitationResolver)
+    - table: with refs == "table", finish with the JSON block of the references used
+    """
+    if dates and calendar is None:
+        calendar = term_calendar(md, start_dt)
+    used: Dict[str, Citation] = {}
+    canonical = getattr(resolve, "canonical", None)
+    pos = 0
+    for m in MACRO_RE.finditer(md):
+        kind = m.group("ikind") or m.group("bkind")
+        if kind:
+            if not dates: continue
+            out = calendar.label(kind.lower(), int(m.group("inum") or m.group("bnum")))
+        elif resolve is None:
+            continue
+        elif m.group("key"):
+            key = m.group("key")
+            ref = resolve(key)
+            if ref is None: continue
+            if canonical is not None: key = canonical(key)
+            used[key] = ref
+            out = cite_anchor(key, ref, refs)
+        else:
+            pieces = []
+            for k in (kk.strip() for kk in m.group("ckeys").split(",")):
+                ref = resolve(k) if k else None
+                if ref is None:
+                    pieces.append(k)
+                else:
+                    if canonical is not None: k = canonical(k)
+                    used[k] = ref
+                    pieces.append(cite_anchor(k, ref, refs))
+            out = "(" + "; ".join(pieces) + ")"
+        if m.start() > pos:
+            yield md[pos:m.start()]
+        yield out
+        pos = m.end()
+    tail = md[pos:]
+    if table and refs == "table":
+        tail = append_refs_table(tail, used)
+    if tail:
+        yield tail
+
+# ---------------- Hugo data export ----------------
+# With --refs shortcode the page only names its citations; Hugo looks them up in this table
+# (site.Data.refs), so a formatting change rewrites one data file instead of the page.
+HUGO_DATA_PATH = os.path.join("data", "refs.json")
+HUGO_DATA_SCOPES = ("cited", "all")
+
+def hugo_refs_data(citations: Dict[str, Citation]) -> str:
+    """{key: {"intext", "html", "plain"}} as JSON with sorted keys, so unchanged data keeps its bytes."""
+    table = {k: {"intext": c[0], "html": c[1], "plain": c[2]} for k, c in citations.items()}
+    return json.dumps(table, ensure_ascii=False, indent=1, sort_keys=True) + "\n"
+
+def cited_keys(inps: List["Input"]) -> Set[str]:
+    keys: Set[str] = set()
+    for inp in inps:
+        keys |= collect_keys(read_input(inp))
+    return keys
+
+def export_hugo_data(path: str, inps: List[str], entries: Dict[str, bibtools.BibEntry],
+                     store: "buildcache.RefStore" = None, scope: str = "cited") -> Tuple[int, bool]:
+    """Write the reference table for the entries cited in inps (or every entry); return (count, changed)."""
+    if scope == "all":
+        keys = set(entries)
+    else:
+        keys = {canonical_key(entries, k) for k in cited_keys(inps)}
+    citations = format_citations(keys, entries, store)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return len(citations), write_if_changed(path, hugo_refs_data(citations))
 
+# ---------------- Incremental build ----------------
+# The input is split before every `## ...` (week) and `### ...` (section) heading. Each block's
+# output is kept in a manifest keyed by the block's text hash, together with the content hashes
+# of the bib entries it cites, so an edit re-renders only the blocks it touches.
+BLOCK_SPLIT_RE = re.compile(r"^(?=#{2,3}[ \t])", re.MULTILINE)
+MANIFEST_VERSION = 3
+
+def split_blocks(md: str) -> List[str]:
+    return [b for b in BLOCK_SPLIT_RE.split(md) if b]
+
+def _text_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def _manifest_path(cache_dir: str, outp: str) -> str:
+    return os.path.join(cache_dir, f"incr-{_text_digest(os.path.abspath(outp))}.pickle")
+
+def _cited_digests(keys: Set[str], entries: Dict[str, bibtools.BibEntry]) -> Dict[str, Optional[str]]:
+    return {k: (buildcache.entry_digest(entries[k]) if k in entries else None) for k in keys}
+
+def build_incremental(md: str, outp: str, bib_path: "BibSources", start_dt: datetime, refs: str,
+                      load_entries, store, cache_dir: str,
+                      timings: buildtimings.Timings = buildtimings.NULL_TIMINGS,
+                      term: Optional[termcalendar.TermDates] = None) -> Tuple[str, Dict[str, Tuple[str,str,str]], int, int]:
+    """Return (output, citations, re-rendered blocks, total blocks), reusing unchanged blocks."""
+    calendar = term_calendar(md, start_dt, term)
+    context = [MANIFEST_VERSION, FORMATTER_VERSION, refs, calendar.key]
+    bib_digest = buildcache.sources_digest(bib_path, cache_dir)
+    mpath = _manifest_path(cache_dir, outp)
+    manifest = buildcache.load_pickle(mpath)
+    if not isinstance(manifest, dict) or manifest.get("context") != context:
+        manifest = {"context": context, "bib": None, "blocks": {}}
+    old_blocks = manifest["blocks"]
+    bib_changed = manifest["bib"] != bib_digest
+
+    entries: Optional[Dict[str, bibtools.BibEntry]] = None
+    def get_entries():
+        nonlocal entries
+        if entries is None:
+            entries = load_entries()
+        return entries
+
+    new_blocks, pieces = {}, []
+    citations: Dict[str, Tuple[str,str,str]] = {}
+    rendered = 0
+    blocks = split_blocks(md)
+    for block in blocks:
+        h = _text_digest(block)
+        rec = new_blocks.get(h) or old_blocks.get(h)
+        if rec is not None and bib_changed and _cited_digests(set(rec["cites"]), get_entries()) != rec["cites"]:
+            rec = None
+        if rec is None:
+            resolver = CitationResolver(get_entries(), store, timings)
+            out = "".join(transform_chunks(block, start_dt, resolver, refs, calendar, table=False))
+            rec = {"cites": _cited_digests(resolver.seen, get_entries()), "out": out, "refs": resolver.citations}
+            rendered += 1
+        new_blocks[h] = rec
+        pieces.append(rec["out"])
+        citations.update(rec["refs"])
+
+    manifest = {"context": context, "bib": bib_digest, "blocks": new_blocks}
+    buildcache.save_pickle(mpath, manifest)
+    md2 = "".join(pieces)
+    if refs == "table":
+        md2 = append_refs_table(md2, citations)
+    return md2, citations, rendered, len(blocks)
+
+def write_if_changed(path: str, chunks) -> bool:
+    """Stream text chunks to path unless the file already holds exactly these bytes.
+
+    Chunks go to a temp file while being compared against the current file, so neither
+    version is held in memory; the temp file replaces path only if something differed."""
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        old = open(path, "rb")
+    except OSError:
+        old = None
+    same = old is not None
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                f.write(data)
+                if same and old.read(len(data)) != data:
+                    same = False
+        if same and old.read(1):
+            same = False
+    finally:
+        if old is not None: old.close()
+    if same:
+        os.remove(tmp)
+        return False
+    os.replace(tmp, path)
+    return True
+
+# ---------------- Build ----------------
+Input = Union[str, io.StringIO]  # a path, or the document text in memory
+
+def read_input(inp: Input) -> str:
+    if isinstance(inp, io.StringIO):
+        return inp.getvalue()
+    with open(inp, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+def build_document(inp: Input, outp: str, start_dt: datetime, refs: str, load_entries,
+                   store: "buildcache.RefStore", bib_path: "BibSources", cache_dir: str,
+                   incremental: bool,
+                   timings: buildtimings.Timings = buildtimings.NULL_TIMINGS,
+                   term: Optional[termcalendar.TermDates] = None) -> Tuple[Dict[str, Citation], bool, str]:
+    """Render one document; return (citations, whether outp was rewritten, report note).
+    term: skipped weeks/holidays on top of those declared in the document."""
+    with timings.stage("read"):
+        md = read_input(inp)
+    if incremental:
+        with timings.stage("incremental"):
+            md2, citations, rendered, total = build_incremental(md, outp, bib_path, start_dt, refs,
+                                                                load_entries, store, cache_dir, timings, term)
+        note = f" ({rendered}/{total} blocks re-rendered)"
+        timings.count("blocks_rendered", rendered)
+        with timings.stage("write"):
+            changed = write_if_changed(outp, md2)
+    else:
+        resolver = CitationResolver(load_entries(), store, timings)
+        with timings.stage("transform+write"):
+            # dates and citations are expanded as write_if_changed consumes the stream
+            changed = write_if_changed(outp, transform_chunks(md, start_dt, resolver, refs,
+                                                              term_calendar(md, start_dt, term)))
+        citations = resolver.citations
+        note = ""
+        timings.count("keys_cited", len(resolver.seen))
+        timings.count("keys_missing", len(resolver.missing))
+    if timings.enabled:
+        timings.count("bytes_written", os.path.getsize(outp) if changed else 0)
+    return citations, changed, note
+
+def report_document(outp: str, n_citations: int, changed: bool, note: str, seconds: Optional[float] = None):
+    timing = f" [{seconds * 1000:.1f} ms]" if seconds is not None else ""
+    if changed:
+        print(f"[done] wrote {outp} with {n_citations} popover references{note}{timing}")
+    else:
+        print(f"[done] {outp} unchanged ({n_citations} popover references){note}{timing}")
+
+# ---------------- Bib sources ----------------
+# Several --bib files are layered in priority order (bibtools.LayeredBib); a lower one is loaded
+# only when a cited key is not in the ones above it. An alias map (merge_bibs.py) adds alternative
+# keys. Anything keyed by "the bib" (incremental manifests, the key index) uses the digest of all
+# sources: the bib paths plus the alias map.
+BibSources = Union[str, Sequence[str]]  # one bib path, or every file the entries come from
+
+def load_bibs(bib_paths: Sequence[str], aliases: Optional[Dict[str, str]] = None, lazy: bool = False,
+              cache_dir: str = buildcache.CACHE_DIR, use_cache: bool = True, rebuild: bool = False,
+              max_bytes: int = buildcache.DEFAULT_MAX_BYTES):
+    """Entries of one bib (as before), or a LayeredBib over several and/or with aliases."""
+    if lazy:
+        loaders = [functools.partial(buildcache.load_bib_index, p, cache_dir=cache_dir, use_cache=use_cache,
+                                     rebuild=rebuild, max_bytes=max_bytes) for p in bib_paths]
+    else:
+        loaders = [functools.partial(buildcache.load_bib, p, parse_bib, cache_dir=cache_dir, use_cache=use_cache,
+                                     rebuild=rebuild, max_bytes=max_bytes) for p in bib_paths]
+    if len(loaders) == 1 and not aliases:
+        return loaders[0]()
+    return bibtools.LayeredBib(loaders, aliases)
+
+# ---------------- Library API ----------------
+TextSource = Union[str, TextIO]  # text itself, or a file object to read it from
+
+def _read_source(src: TextSource) -> str:
+    return src if isinstance(src, str) else src.read()
+
+class SchedulePipeline:
+    """Renders schedule markdown to markdown in memory, against one resident bib.
+
+    Give exactly one of bib_path (loaded through the on-disk cache unless use_cache=False),
+    bib_text (a string or file object) or entries (an already parsed {key: BibEntry} mapping).
+    Markdown is passed as text or a file object, never as a path. term adds skipped weeks and
+    holidays to those the markdown declares. Safe to share between threads."""
+
+    def __init__(self, bib_path: Optional[str] = None, bib_text: Optional[TextSource] = None,
+                 entries: Optional[Dict[str, bibtools.BibEntry]] = None, start: str = "2026-01-21",
+                 tz: str = "America/Chicago", refs: str = "inline", use_cache: bool = True,
+                 cache_dir: str = buildcache.CACHE_DIR, store: "buildcache.RefStore" = None,
+                 term: Optional[termcalendar.TermDates] = None):
+        if sum(x is not None for x in (bib_path, bib_text, entries)) != 1:
+            raise ValueError("give exactly one of bib_path, bib_text, entries")
+        self.start_dt = datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=ZoneInfo(tz))
+        self.term = term
+        self.refs = refs
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.store = store
+        self.bib_path = bib_path
+        if bib_path is not None:
+            self.reload()
+        elif bib_text is not None:
+            self.entries = parse_bib(_read_source(bib_text))
+        else:
+            self.entries = entries
+
+    def reload(self, bib_text: Optional[TextSource] = None) -> None:
+        """Re-read bib_path (or parse the given bib text) and swap it in."""
+        if bib_text is not None:
+            self.entries = parse_bib(_read_source(bib_text))
+        else:
+            self.entries = buildcache.load_bib(self.bib_path, parse_bib, cache_dir=self.cache_dir,
+                                               use_cache=self.use_cache)
+
+    def render_with_citations(self, md: TextSource, refs: Optional[str] = None) -> Tuple[str, Dict[str, Citation]]:
+        resolver = CitationResolver(self.entries, self.store)
+        md = _read_source(md)
+        out = "".join(transform_chunks(md, self.start_dt, resolver, refs or self.refs,
+                                       term_calendar(md, self.start_dt, self.term)))
+        return out, resolver.citations
+
+    def render(self, md: TextSource, refs: Optional[str] = None) -> str:
+        return self.render_with_citations(md, refs)[0]
+
+    def render_to(self, md: TextSource, out: Union[str, TextIO], refs: Optional[str] = None) -> bool:
+        """Render into a path (streamed, rewritten only if changed; returns whether it was) or a file object."""
+        md = _read_source(md)
+        chunks = transform_chunks(md, self.start_dt, CitationResolver(self.entries, self.store),
+                                  refs or self.refs, term_calendar(md, self.start_dt, self.term))
+        if isinstance(out, str):
+            return write_if_changed(out, chunks)
+        for chunk in chunks:
+            out.write(chunk)
+        return True
+
+# ---------------- Batch build ----------------
+# Several documents share one bib load; the per-document transforms fan out over a process
+# pool (threads for small inputs, where process start-up would dominate).
+EXECUTORS = ("auto", "process", "thread")
+SMALL_BATCH_BYTES = 512 * 1024
+
+_WORKER: Dict = {}
+
+def _init_worker(entries, bib_path: str, lazy_index, cache_dir: str, use_cache: bool, max_refs: int,
+                 author_cache: int = AUTHOR_CACHE_SIZE):
+    set_author_cache_size(author_cache)
+    if lazy_index is not None:
+        entries = bibtools.LazyBib(bib_path, lazy_index)
+    _WORKER["entries"] = entries
+    _WORKER["store"] = buildcache.RefStore(cache_dir, FORMATTER_VERSION, max_entries=max_refs) if use_cache else None
+
+def _worker_build(inp: str, outp: str, start_dt: datetime, refs: str, bib_path: "BibSources", cache_dir: str,
+                  incremental: bool, term: Optional[termcalendar.TermDates] = None):
+    store = _WORKER["store"]
+    if store is not None: store.added = {}
+    t0 = time.perf_counter()
+    citations, changed, note = build_document(inp, outp, start_dt, refs, lambda: _WORKER["entries"], store,
+                                              bib_path, cache_dir, incremental, term=term)
+    added = store.added if store is not None else {}
+    return len(citations), changed, note, time.perf_counter() - t0, added
+
+def build_batch(docs: List[Tuple[str, str]], start_dt: datetime, refs: str, entries, store,
+                bib_path: "BibSources", cache_dir: str, incremental: bool, use_cache: bool, max_refs: int,
+                jobs: Optional[int] = None, executor: str = "auto",
+                term: Optional[termcalendar.TermDates] = None) -> Tuple[str, List[float]]:
+    """Build every (inp, outp) pair; return the executor used and per-document seconds."""
+    if executor == "auto":
+        small = sum(os.path.getsize(i) for i, _ in docs) < SMALL_BATCH_BYTES
+        executor = "thread" if small else "process"
+    workers = min(len(docs), jobs or os.cpu_count() or 1)
+    seconds: List[float] = [0.0] * len(docs)
+    if executor == "thread":
+        def one(doc):
+            t0 = time.perf_counter()
+            citations, changed, note = build_document(doc[0], doc[1], start_dt, refs, lambda: entries, store,
+                                                      bib_path, cache_dir, incremental, term=term)
+            return len(citations), changed, note, time.perf_counter() - t0, {}
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = [pool.submit(one, doc) for doc in docs]
+    else:
+        lazy_index = entries.index if isinstance(entries, bibtools.LazyBib) else None
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(None if lazy_index is not None else entries, bib_path, lazy_index,
+                                             cache_dir, use_cache, max_refs, parse_person.cache_info().maxsize))
+        futures = [pool.submit(_worker_build, i, o, start_dt, refs, bib_path, cache_dir, incremental, term)
+                   for i, o in docs]
+    with pool:
+        for idx, fut in enumerate(futures):
+            n, changed, note, secs, added = fut.result()
+            if store is not None and added: store.merge(added)
+            seconds[idx] = secs
+            report_document(docs[idx][1], n, changed, note, secs)
+    return f"{executor} x{workers}", seconds
+
+# ---------------- Watch mode ----------------
+# Long-running rebuild loop: the parsed bib (ResidentBib) and formatted references (RefStore)
+# stay in memory, inputs are polled with os.stat, and bursts of saves are debounced.
+def _stat_sig(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _read_bib_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+def watch(docs: List[Tuple[str, str]], bib_paths: Sequence[str], start_dt: datetime, refs: str, store,
+          cache_dir: str, poll: float = 0.02, debounce: float = 0.03, aliases: Optional[Dict[str, str]] = None,
+          term: Optional[termcalendar.TermDates] = None, hugo_data: Optional[str] = None,
+          hugo_data_scope: str = "cited"):
+    resident = {p: bibtools.ResidentBib(_read_bib_text(p)) for p in bib_paths}
+    bib = (resident[bib_paths[0]] if len(resident) == 1 and not aliases
+           else bibtools.LayeredBib(list(resident.values()), aliases))
+    def rebuild(targets: List[Tuple[str, str]]):
+        for inp, outp in targets:
+            if not os.path.exists(inp):
+                print(f"[warn] input missing (skipped): {inp}"); continue
+            t0 = time.perf_counter()
+            citations, changed, note = build_document(inp, outp, start_dt, refs, lambda: bib, store,
+                                                      bib_paths, cache_dir, False, term=term)
+            report_document(outp, len(citations), changed, note, time.perf_counter() - t0)
+        if hugo_data:
+            n, changed = export_hugo_data(hugo_data, [inp for inp, _ in docs if os.path.exists(inp)], bib,
+                                          store, hugo_data_scope)
+            if changed: print(f"[done] wrote {hugo_data} with {n} references")
+        if store is not None: store.save()
+
+    rebuild(docs)
+    paths = list(bib_paths) + [inp for inp, _ in docs]
+    last = {p: _stat_sig(p) for p in paths}
+    print(f"[watch] watching {len(paths)} files (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(poll)
+            cur = {p: _stat_sig(p) for p in paths}
+            if cur == last:
+                continue
+            while True:  # wait for the burst of writes to settle
+                time.sleep(debounce)
+                settled = {p: _stat_sig(p) for p in paths}
+                if settled == cur: break
+                cur = settled
+            changed = {p for p in paths if cur[p] != last[p]}
+            last = cur
+            t0 = time.perf_counter()
+            note = ""
+            updated = [p for p in bib_paths if p in changed and cur[p] is not None]
+            if updated:
+                n = sum(resident[p].update(_read_bib_text(p)) for p in updated)
+                note = f", {n} bib entries re-parsed"
+                targets = docs
+            else:
+                targets = [d for d in docs if d[0] in changed]
+            rebuild(targets)
+            print(f"[watch] rebuilt {len(targets)} document(s) in {(time.perf_counter() - t0) * 1000:.1f} ms{note}")
+    except KeyboardInterrupt:
+        print("[watch] stopped")
 
 # ---------------- Main ----------------
-def main(inp: str, outp: str, bib_path: str, tz: str, start: str):
-    if not os.path.exists(inp): raise SystemExit(f"[error] input not found: {inp}")
-    if not os.path.exists(bib_path): raise SystemExit(f"[error] bib not found: {bib_path}")
-    md = open(inp, "r", encoding="utf-8", errors="ignore").read()
-    bib = open(bib_path, "r", encoding="utf-8", errors="ignore").read()
+def main(inp: Union[Input, List[Input]], outp: Union[str, List[str]], bib_path: BibSources, tz: str, start: str,
+         refs: str = "inline", use_cache: bool = True, rebuild_cache: bool = False,
+         cache_dir: str = buildcache.CACHE_DIR, cache_max_mb: float = buildcache.DEFAULT_MAX_BYTES / 2**20,
+         cache_max_refs: int = buildcache.DEFAULT_MAX_REFS, incremental: bool = False,
+         lazy: bool = False, jobs: Optional[int] = None, executor: str = "auto",
+         watch_mode: bool = False, poll_ms: float = 20, debounce_ms: float = 30,
+         timings: buildtimings.Timings = buildtimings.NULL_TIMINGS, timings_format: str = "text",
+         timings_out: Optional[str] = None, author_cache: int = AUTHOR_CACHE_SIZE,
+         hugo_data: Optional[str] = None, hugo_data_scope: str = "cited",
+         check_links: bool = False, link_ttl_hours: Optional[float] = None, link_jobs: Optional[int] = None,
+         link_rate: Optional[float] = None, strict: bool = False, aliases: Optional[str] = None,
+         term: Optional[termcalendar.TermDates] = None, calendar_out: Sequence[str] = ()):
+    """Build one document, or several (inp/outp as equal-length lists) against a single bib load.
+    A single document may be given in memory as an io.StringIO. With watch_mode, keep rebuilding whenever an input or the bib changes. An enabled `timings`
+    is filled per stage and reported at the end (not in watch mode). hugo_data: also write the
+    reference table for Hugo there (see export_hugo_data); refs="shortcode" needs it, so it
+    defaults to HUGO_DATA_PATH then. check_links: afterwards, check the
+    links of the cited references (see linkcheck.py). Cited keys missing from the bib are
+    reported with "did you mean" suggestions (keysuggest.py); with strict, they fail the build.
+    bib_path may list several bibs, highest priority first (see load_bibs); aliases: path of a
+    JSON alias map from merge_bibs.py. term: skipped weeks/holidays for the date macros (see
+    termcalendar.py); calendar_out: .ics/.json paths to export the inputs' sessions to."""
+    inps = [inp] if isinstance(inp, (str, io.StringIO)) else list(inp)
+    outps = [outp] if isinstance(outp, str) else list(outp)
+    if len(inps) != len(outps): raise SystemExit(f"[error] {len(inps)} inputs but {len(outps)} outputs")
+    for i in inps:
+        if not isinstance(i, str):
+            if len(inps) > 1 or watch_mode: raise SystemExit("[error] in-memory input only for a single, non-watch build")
+        elif not os.path.exists(i): raise SystemExit(f"[error] input not found: {i}")
+    bib_paths = [bib_path] if isinstance(bib_path, str) else list(bib_path)
+    for p in bib_paths:
+        if not os.path.exists(p): raise SystemExit(f"[error] bib not found: {p}")
+    if aliases and not os.path.exists(aliases): raise SystemExit(f"[error] alias map not found: {aliases}")
+    if refs == "shortcode" and not hugo_data:
+        # the shortcodes only name their keys; without the table Hugo can only print @key
+        hugo_data = HUGO_DATA_PATH
+        print(f"[info] --refs shortcode: writing the reference table to {hugo_data} (--hugo-data PATH to move it)")
+    alias_map = bibtools.load_aliases(aliases) if aliases else None
+    # what the entries depend on; a single bib stays a plain path
+    sources = bib_paths[0] if len(bib_paths) == 1 and not aliases else bib_paths + ([aliases] if aliases else [])
+    if incremental and not use_cache: raise SystemExit("[error] --incremental needs the cache (drop --no-cache)")
+    incremental = incremental and not rebuild_cache
 
     start_dt = datetime.strptime(start, "%Y-%m-%d").replace(tzinfo=ZoneInfo(tz))
-    md1 = preprocess_dates(md, start_dt)
+    if author_cache != parse_person.cache_info().maxsize:
+        set_author_cache_size(author_cache)
+    loaded = []  # the entries load_entries() returned, for the timings counters
+    def load_entries():
+        with timings.stage("load_bib"):
+            entries = load_bibs(bib_paths, alias_map, lazy, cache_dir=cache_dir, use_cache=use_cache,
+                                rebuild=rebuild_cache, max_bytes=int(cache_max_mb * 2**20))
+        if not isinstance(entries, bibtools.LayeredBib):  # counting a layered bib would load every layer
+            timings.count("bib_entries", len(entries))
+        loaded.append(entries)
+        return entries
+    with timings.stage("open_refstore"):
+        store = buildcache.RefStore(cache_dir, FORMATTER_VERSION, max_entries=cache_max_refs,
+                                    ignore_existing=rebuild_cache) if use_cache else None
 
-    entries = parse_bib(bib)
-    keys = collect_keys(md1)
-    citations: Dict[str, Tuple[str,str,str]] = {}
-    for k in keys:
-        e = entries.get(k)
-        if not e: continue
-        citations[k] = apa_html_and_plain(e)
+    def finish(resolved):
+        with timings.stage("check_keys"):
+            missing = {k for k in cited_keys(inps) if k not in resolved}
+            if missing:
+                entries = loaded[-1] if loaded else load_entries()
+                missing = {k for k in missing if k not in entries}  # resolved may hold canonical keys only
+            if missing:
+                index = buildcache.load_key_index(sources, entries, cache_dir=cache_dir, use_cache=use_cache,
+                                                  rebuild=rebuild_cache, max_bytes=int(cache_max_mb * 2**20),
+                                                  keys_only=lazy)
+                for line in keysuggest.format_missing(missing, index):
+                    print(line)
+        if calendar_out:
+            with timings.stage("calendar"):
+                scheduled, calendar = {}, None
+                for i in inps:
+                    md = read_input(i)
+                    calendar = term_calendar(md, start_dt, term)
+                    for s, title in termcalendar.document_sessions(md, calendar):
+                        scheduled.setdefault((s.kind, s.week, s.date), (s, title))
+                sessions = sorted(scheduled.values(), key=lambda x: (x[0].date, termcalendar.KINDS.index(x[0].kind)))
+                for path in calendar_out:
+                    changed = termcalendar.export(path, sessions, calendar if len(inps) == 1 else None)
+                    print(f"[done] {'wrote' if changed else 'unchanged'} {path} ({len(sessions)} sessions)")
+        if hugo_data:
+            with timings.stage("hugo_data"):
+                n, changed = export_hugo_data(hugo_data, inps, loaded[-1] if loaded else load_entries(),
+                                              store, hugo_data_scope)
+            print(f"[done] wrote {hugo_data} with {n} references" if changed else
+                  f"[done] {hugo_data} unchanged ({n} references)")
+        if check_links:
+            import linkcheck
+            with timings.stage("check_links"):
+                entries = loaded[-1] if loaded else load_entries()
+                owners: Dict[str, List[str]] = {}
+                for k in sorted({canonical_key(entries, k) for k in cited_keys(inps)}):
+                    link = entry_link(entries[k]) if k in entries else ""
+                    if link: owners.setdefault(link, []).append(k)
+                results = linkcheck.check_links(
+                    owners, cache_dir, use_cache=use_cache,
+                    ttl_hours=linkcheck.DEFAULT_TTL_HOURS if link_ttl_hours is None else link_ttl_hours,
+                    jobs=link_jobs or linkcheck.DEFAULT_JOBS,
+                    rate=linkcheck.DEFAULT_RATE if link_rate is None else link_rate)
+                linkcheck.report(results, owners)
+        with timings.stage("save_cache"):
+            if store is not None: store.save()
+        if timings.enabled:
+            if loaded and lazy:
+                timings.count("entries_parsed", loaded[-1].parsed)
+            if loaded and isinstance(loaded[-1], bibtools.LayeredBib):
+                timings.count("bib_layers_loaded", len(loaded[-1].layers))
+            if store is not None:
+                timings.count("refstore_hits", store.hits)
+                timings.count("refstore_misses", store.misses)
+            for name, n in author_cache_stats().items():
+                timings.count(name, n)
+            timings.report(timings_format, timings_out)
+        if strict and missing:
+            raise SystemExit(f"[error] {len(missing)} cited keys not in {', '.join(bib_paths)} (--strict)")
+
+    if watch_mode:
+        watch(list(zip(inps, outps)), bib_paths, start_dt, refs, store, cache_dir,
+              poll=poll_ms / 1000, debounce=debounce_ms / 1000, aliases=alias_map, term=term,
+              hugo_data=hugo_data, hugo_data_scope=hugo_data_scope)
+        return
+
+    try:
+        if len(inps) == 1:
+            citations, changed, note = build_document(inps[0], outps[0], start_dt, refs, load_entries, store,
+                                                      sources, cache_dir, incremental, timings, term)
+            report_document(outps[0], len(citations), changed, note)
+            finish(citations)
+            return
 
-    md2 = inject_popovers(md1, citations)
+        t0 = time.perf_counter()
+        entries = load_entries()
+        t_bib = time.perf_counter() - t0
+        with timings.stage("batch"):
+            how, seconds = build_batch(list(zip(inps, outps)), start_dt, refs, entries, store, sources, cache_dir,
+                                       incremental, use_cache, cache_max_refs, jobs, executor, term)
+        total = time.perf_counter() - t0
+        print(f"[batch] {len(inps)} documents ({how}): bib {t_bib * 1000:.1f} ms, "
+              f"slowest document {max(seconds) * 1000:.1f} ms, total {total * 1000:.1f} ms")
+        timings.count("documents", len(inps))
+        finish(entries)
+    finally:
+        for entries in loaded:  # a lazy bib keeps its file mapped until closed
+            bibtools.close_bib(entries)
 
-    with open(outp, "w", encoding="utf-8") as f:
-        f.write(md2)
-    print(f"[done] wrote {outp} with {len(citations)} popover references")
+def read_manifest(path: str) -> Tuple[List[str], List[str]]:
+    """JSON manifest: [{"in": ..., "out": ...}, ...] or {"documents": [...]}."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    docs = data.get("documents", []) if isinstance(data, dict) else data
+    try:
+        return [d["in"] for d in docs], [d["out"] for d in docs]
+    except (KeyError, TypeError):
+        raise SystemExit(f"[error] manifest entries need \"in\" and \"out\": {path}")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Build schedule.md from schedule_bib.md by expanding dates and in-text popover citations.")
-    ap.add_argument("--in", dest="inp", required=True, help="Path to schedule_bib.md")
-    ap.add_argument("--out", dest="outp", required=True, help="Path to output schedule.md")
-    ap.add_argument("--bib", required=True, help="Path to .bib (pruned or full)")
+    ap.add_argument("--in", dest="inp", action="append", default=[], help="Path to schedule_bib.md (repeat with --out for several documents)")
+    ap.add_argument("--out", dest="outp", action="append", default=[], help="Path to output schedule.md (one per --in)")
+    ap.add_argument("--manifest", help='JSON list of {"in": ..., "out": ...} documents to build (added to any --in/--out pairs)')
+    ap.add_argument("--bib", action="append", required=True,
+                    help="Path to .bib (pruned or full); repeat for fallback libraries, highest priority first "
+                         "(a later one is read only for keys the earlier ones lack)")
+    ap.add_argument("--aliases", help="JSON alias map from merge_bibs.py: alternative keys resolve to the canonical entry")
     ap.add_argument("--tz", default="America/Chicago", help="IANA timezone (default America/Chicago)")
     ap.add_argument("--start", default="2026-01-21", help="Start Wednesday YYYY-MM-DD (default 2026-01-21)")
+    termcalendar.add_cli_options(ap)
+    ap.add_argument("--calendar-out", action="append", default=[], metavar="PATH",
+                    help="Also export the sessions the date macros name as iCalendar (.ics) or JSON (repeatable)")
+    ap.add_argument("--refs", choices=REFS_MODES, default="inline",
+                    help="inline: full reference on every anchor; table: emit each reference once and link by key; "
+                         "shortcode: emit {{< cite \"key\" >}} for Hugo to resolve from --hugo-data "
+                         f"(written to {HUGO_DATA_PATH} unless --hugo-data gives another path)")
+    ap.add_argument("--no-cache", action="store_true", help="Parse the .bib without reading or writing the on-disk cache")
+    ap.add_argument("--rebuild-cache", action="store_true", help="Re-parse the .bib and re-format references, overwriting the cache")
+    ap.add_argument("--cache-dir", default=buildcache.CACHE_DIR, help="Cache directory (default .cache)")
+    ap.add_argument("--cache-max-mb", type=float, default=buildcache.DEFAULT_MAX_BYTES / 2**20,
+                    help="Size cap for cached parses; least recently used files are evicted (default 64)")
+    ap.add_argument("--cache-max-refs", type=int, default=buildcache.DEFAULT_MAX_REFS,
+                    help="Max formatted references kept in the shared store, LRU-evicted (default 20000)")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Re-render only the week/section blocks whose text or cited entries changed")
+    ap.add_argument("--lazy", action="store_true",
+                    help="Index the .bib by citekey and parse only cited entries (for large libraries)")
+    ap.add_argument("--jobs", type=int, help="Workers for multi-document builds (default: CPU count)")
+    ap.add_argument("--executor", choices=EXECUTORS, default="auto",
+                    help="Pool for multi-document builds; auto uses threads for small inputs (default auto)")
+    ap.add_argument("--watch", action="store_true",
+                    help="Keep running: rebuild whenever an input or the .bib changes (bib stays parsed in memory)")
+    ap.add_argument("--poll-ms", type=float, default=20, help="--watch polling interval (default 20)")
+    ap.add_argument("--debounce-ms", type=float, default=30,
+                    help="--watch: wait this long for a burst of saves to settle before rebuilding (default 30)")
+    ap.add_argument("--hugo-data", nargs="?", const=HUGO_DATA_PATH, metavar="PATH",
+                    help=f"Also write the formatted reference table for Hugo (default path {HUGO_DATA_PATH})")
+    ap.add_argument("--hugo-data-scope", choices=HUGO_DATA_SCOPES, default="cited",
+                    help="Entries in the --hugo-data table: cited by the inputs, or all in the .bib (default cited)")
+    ap.add_argument("--check-links", action="store_true",
+                    help="After building, check the DOI/URL links of cited references and report dead or moved ones")
+    ap.add_argument("--link-ttl-hours", type=float, help="--check-links: re-check cached results older than this (default 168)")
+    ap.add_argument("--link-jobs", type=int, help="--check-links: hosts checked at once (default 8)")
+    ap.add_argument("--link-rate", type=float, help="--check-links: requests per second per host (default 2)")
+    ap.add_argument("--author-cache", type=int, default=AUTHOR_CACHE_SIZE,
+                    help=f"LRU size for memoized author names and author fields (default {AUTHOR_CACHE_SIZE})")
+    ap.add_argument("--strict", action="store_true",
+                    help="Fail (exit 1) when a cited key is not in the .bib, after reporting suggestions")
+    buildtimings.add_cli_options(ap)
     args = ap.parse_args()
-    main(args.inp, args.outp, args.bib, args.tz, args.start)
+    if args.manifest:
+        m_in, m_out = read_manifest(args.manifest)
+        args.inp += m_in; args.outp += m_out
+    if not args.inp: ap.error("give --in/--out or --manifest")
+    main(args.inp, args.outp, args.bib, args.tz, args.start, args.refs,
+         use_cache=not args.no_cache, rebuild_cache=args.rebuild_cache,
+         cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb, cache_max_refs=args.cache_max_refs,
+         incremental=args.incremental, lazy=args.lazy, jobs=args.jobs, executor=args.executor,
+         watch_mode=args.watch, poll_ms=args.poll_ms, debounce_ms=args.debounce_ms,
+         timings=buildtimings.from_args(args), timings_format=args.timings or "text", timings_out=args.timings_out,
+         author_cache=args.author_cache, hugo_data=args.hugo_data, hugo_data_scope=args.hugo_data_scope,
+         check_links=args.check_links, link_ttl_hours=args.link_ttl_hours, link_jobs=args.link_jobs,
+         link_rate=args.link_rate, strict=args.strict, aliases=args.aliases,
+         term=termcalendar.from_args(args), calendar_out=args.calendar_out)
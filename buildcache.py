@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+buildcache.py
+
+On-disk cache for build_schedule.py, kept under .cache/ (git-ignored).
+
+- Parsed .bib files are pickled as bib-v<parser>-<sha256>.pickle, keyed by the
+  file's content hash. A small stat index (stat-index.json: path -> size, mtime_ns, sha256)
+  lets a warm build skip reading and hashing a bib that has not been touched; other tools
+  (build_pipeline.py) keep their own index file through file_digest(..., index=...).
+- Lazy mode keeps only a citekey -> byte-span index per bib
+  (bibindex-v<parser>-<sha256>.pickle), so later runs seek straight to cited entries.
+- The "did you mean" index over a bib's citekeys (keysuggest.KeyIndex) is pickled per bib
+  as keyindex-v<index>-<full|keys>-<sha256>.pickle; it is built the first time a key is missing.
+- Formatted references (intext, html, plain) live in one refs-v<formatter>.pickle
+  store keyed by a hash of the entry's type and fields, so it is shared by every
+  course/bib built from the same cache dir. Bumping the formatter version starts
+  a fresh store and deletes the stale ones.
+- Cache files of one kind share a size cap; the least recently used files are
+  evicted first.
+"""
+import hashlib, json, os, pickle, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+import bibtools
+import keysuggest
+
+CACHE_DIR = ".cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_REFS = 20000
+STAT_INDEX = "stat-index.json"
+
+# ---------------- Low-level helpers ----------------
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_text_if_changed(path: str, text: str) -> bool:
+    """Atomically write text unless path already holds exactly these bytes; return whether it was written."""
+    data = text.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(data) + 1) == data:
+                return False
+    except OSError:
+        pass
+    atomic_write_bytes(path, data)
+    return True
+
+def load_pickle(path: str):
+    try:
+        with open(path, "rb") as f:
+            obj = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    try:
+        os.utime(path)  # mark as recently used for eviction
+    except OSError:
+        pass
+    return obj
+
+def save_pickle(path: str, obj) -> None:
+    atomic_write_bytes(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+def evict(cache_dir: str, prefix: str, max_bytes: int, keep: Optional[str] = None) -> int:
+    """Delete least recently used `prefix*` files until their total size fits max_bytes."""
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.startswith(prefix) and not n.endswith(".tmp")]
+    except FileNotFoundError:
+        return 0
+    files = []
+    for name in names:
+        p = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for _, size, p in sorted(files):
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(p) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(p)
+        except OSError:
+            continue
+        total -= size; removed += 1
+    return removed
+
+# ---------------- Stat index ----------------
+_stat_index_lock = threading.Lock()  # serializes read-modify-write of the index between threads
+
+def _read_stat_index(cache_dir: str, index: str = STAT_INDEX) -> Dict[str, list]:
+    try:
+        with open(os.path.join(cache_dir, index), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def file_digest(path: str, cache_dir: str = CACHE_DIR, rehash: bool = False, index: str = STAT_INDEX) -> str:
+    """sha256 of the file, reusing the hash recorded in cache_dir/index when size and mtime are unchanged.
+
+    The lock only covers threads of this process; processes that may run at the same time
+    should use different index files (a lost update only costs a re-hash)."""
+    st = os.stat(path)
+    apath = os.path.abspath(path)
+    rec = _read_stat_index(cache_dir, index).get(apath)
+    if not rehash and rec and rec[0] == st.st_size and rec[1] == st.st_mtime_ns:
+        return rec[2]
+    digest = sha256_file(path)
+    with _stat_index_lock:
+        stats = _read_stat_index(cache_dir, index)
+        stats[apath] = [st.st_size, st.st_mtime_ns, digest]
+        atomic_write_bytes(os.path.join(cache_dir, index), json.dumps(stats, indent=1).encode("utf-8"))
+    return digest
+
+def sources_digest(paths: Union[str, Sequence[str]], cache_dir: str = CACHE_DIR, rehash: bool = False) -> str:
+    """file_digest of one path; for several (layered bibs, alias maps), a hash of their digests in order."""
+    if isinstance(paths, str):
+        return file_digest(paths, cache_dir, rehash)
+    if len(paths) == 1:
+        return file_digest(paths[0], cache_dir, rehash)
+    digests = [file_digest(p, cache_dir, rehash) for p in paths]
+    return hashlib.sha256("\n".join(digests).encode("ascii")).hexdigest()
+
+# ---------------- Parsed bib ----------------
+def bib_cache_path(digest: str, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"bib-v{bibtools.PARSER_VERSION}-{digest}.pickle")
+
+def load_bib(path: str, parse: Callable[[str], Dict[str, bibtools.BibEntry]], cache_dir: str = CACHE_DIR,
+             use_cache: bool = True, rebuild: bool = False,
+             max_bytes: int = DEFAULT_MAX_BYTES) -> Dict[str, bibtools.BibEntry]:
+    """Return parse(<bib text>), served from the on-disk cache when the bib is unchanged."""
+    if not use_cache:
+        return parse(open(path, "r", encoding="utf-8", errors="ignore").read())
+    target = bib_cache_path(file_digest(path, cache_dir, rehash=rebuild), cache_dir)
+    if not rebuild:
+        entries = load_pickle(target)
+        if entries is not None:
+            return entries
+    entries = parse(open(path, "r", encoding="utf-8", errors="ignore").read())
+    save_pickle(target, entries)
+    evict(cache_dir, "bib-v", max_bytes, keep=target)
+    return entries
+
+def load_bib_index(path: str, cache_dir: str = CACHE_DIR, use_cache: bool = True, rebuild: bool = False,
+                   max_bytes: int = DEFAULT_MAX_BYTES) -> bibtools.LazyBib:
+    """LazyBib over path, reusing the cached key -> span index when the bib is unchanged."""
+    if not use_cache:
+        return bibtools.LazyBib(path)
+    target = os.path.join(cache_dir, f"bibindex-v{bibtools.PARSER_VERSION}-{file_digest(path, cache_dir, rehash=rebuild)}.pickle")
+    index = None if rebuild else load_pickle(target)
+    if isinstance(index, dict):
+        return bibtools.LazyBib(path, index)
+    bib = bibtools.LazyBib(path)
+    save_pickle(target, bib.index)
+    evict(cache_dir, "bibindex-v", max_bytes, keep=target)
+    return bib
+
+def load_key_index(path: Union[str, Sequence[str]], entries, cache_dir: str = CACHE_DIR, use_cache: bool = True,
+                   rebuild: bool = False, max_bytes: int = DEFAULT_MAX_BYTES,
+                   keys_only: Optional[bool] = None) -> keysuggest.KeyIndex:
+    """KeyIndex over the bib(s) at path, reusing the cached one when they are unchanged.
+
+    Parsed entries contribute their author/year/title tokens; a LazyBib (or keys_only) is
+    indexed by key only, so nothing beyond the key -> span index gets parsed."""
+    if keys_only is None:
+        keys_only = isinstance(entries, bibtools.LazyBib)
+    def build():
+        return keysuggest.KeyIndex.from_keys(entries) if keys_only else keysuggest.KeyIndex.from_entries(entries)
+    if not use_cache:
+        return build()
+    kind = "keys" if keys_only else "full"
+    target = os.path.join(cache_dir, f"keyindex-v{keysuggest.INDEX_VERSION}-{kind}-{sources_digest(path, cache_dir, rehash=rebuild)}.pickle")
+    index = None if rebuild else load_pickle(target)
+    if isinstance(index, keysuggest.KeyIndex):
+        return index
+    index = build()
+    save_pickle(target, index)
+    evict(cache_dir, "keyindex-v", max_bytes, keep=target)
+    return index
+
+# ---------------- Formatted references ----------------
+def entry_digest(entry: bibtools.BibEntry) -> str:
+    """Content hash of an entry's type and (whitespace-normalized) fields; the citekey is not part of it."""
+    fields = sorted((k.strip().lower(), " ".join(v.split())) for k, v in entry.items())
+    payload = json.dumps([entry.type.lower(), fields], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+class RefStore:
+    """LRU store of formatted references: entry_digest -> (intext, html, plain).
+
+    The file is shared by every build using the cache directory, so save() only writes when
+    something was added, and merges into whatever is on disk at that moment rather than
+    overwriting it with this process's (possibly older) copy."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, version: int = 1,
+                 max_entries: int = DEFAULT_MAX_REFS, ignore_existing: bool = False):
+        self.path = os.path.join(cache_dir, f"refs-v{version}.pickle")
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self.dirty = False  # something was added since the last save()
+        self.added: Dict[str, Tuple[str, str, str]] = {}  # put() since construction (for merging worker stores)
+        self._unsaved: Dict[str, Tuple[str, str, str]] = {}
+        self._used: set = set()  # digests hit since the last save(), moved to the LRU end when saving
+        self._replace = ignore_existing  # first save() starts from an empty store instead of the file
+        self._lock = threading.Lock()
+        data = None if ignore_existing else load_pickle(self.path)
+        self.refs: "OrderedDict[str, Tuple[str, str, str]]" = data if isinstance(data, OrderedDict) else OrderedDict()
+
+    def get(self, entry: bibtools.BibEntry) -> Optional[Tuple[str, str, str]]:
+        digest = entry_digest(entry)
+        with self._lock:
+            ref = self.refs.get(digest)
+            if ref is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.refs.move_to_end(digest)
+            self._used.add(digest)
+            return ref
+
+    def put(self, entry: bibtools.BibEntry, ref: Tuple[str, str, str]) -> None:
+        self.merge({entry_digest(entry): tuple(ref)})
+
+    def merge(self, refs: Dict[str, Tuple[str, str, str]]) -> None:
+        """Add already-digested references (e.g. the `added` dict of a worker process's store)."""
+        with self._lock:
+            for digest, ref in refs.items():
+                self.refs[digest] = ref
+                self.refs.move_to_end(digest)
+                self.added[digest] = ref
+                self._unsaved[digest] = ref
+            self.dirty = True
+
+    def save(self) -> None:
+        """Merge the references added (and the recency of those hit) into the on-disk store and write it."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = None if self._replace else load_pickle(self.path)
+            refs = data if isinstance(data, OrderedDict) else OrderedDict()
+            for digest in self._used:
+                if digest in refs:
+                    refs.move_to_end(digest)
+            for digest, ref in self._unsaved.items():
+                refs[digest] = ref
+                refs.move_to_end(digest)
+            while len(refs) > self.max_entries:
+                refs.popitem(last=False)
+            save_pickle(self.path, refs)
+            self.refs = refs
+            self._unsaved, self._used = {}, set()
+            self._replace = self.dirty = False
+        # other formatter versions can never be hit again
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        own = os.path.basename(self.path)
+        for name in names:
+            if name.startswith("refs-v") and name.endswith(".pickle") and name != own:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
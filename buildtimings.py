@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+buildtimings.py
+
+Per-stage instrumentation shared by build_schedule.py and prune_bib_old.py
+(--timings / --profile).
+
+- Timings.stage(name) times a block (wall clock; with trace_memory also the net and
+  peak tracemalloc allocations of top-level stages); repeated stages accumulate, and
+  stages may nest (e.g. formatting happens lazily inside the streamed transform).
+- Timings.count(name, n) keeps counters (entries parsed, keys cited, cache hits, ...).
+- One stage can be run under cProfile; the dump (for pstats/snakeviz) is written by report().
+- report() prints a text table or JSON.
+"""
+import cProfile, json, sys, time, tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class Timings:
+    def __init__(self, enabled: bool = True, trace_memory: bool = False,
+                 cprofile_stage: Optional[str] = None, cprofile_out: Optional[str] = None):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_out = cprofile_out or (f"{cprofile_stage}.prof" if cprofile_stage else None)
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self._depth = 0
+        self._prof: Optional[cProfile.Profile] = None
+        self._t0 = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _slot(self, name: str) -> Dict[str, float]:
+        return self.stages.setdefault(name, {"depth": self._depth, "calls": 0, "wall_ms": 0.0,
+                                             "alloc_kb": 0.0, "peak_kb": 0.0})
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        slot = self._slot(name)
+        track = self.trace_memory and self._depth == 0  # reset_peak() would spoil an enclosing stage
+        prof = None
+        if name == self.cprofile_stage:
+            prof = self._prof = self._prof or cProfile.Profile()
+        if track:
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        self._depth += 1
+        if prof is not None:
+            prof.enable()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            if prof is not None:
+                prof.disable()
+            self._depth -= 1
+            slot["calls"] += 1
+            slot["wall_ms"] += wall * 1000
+            if track:
+                cur, peak = tracemalloc.get_traced_memory()
+                slot["alloc_kb"] += (cur - mem0) / 1024
+                slot["peak_kb"] = max(slot["peak_kb"], (peak - mem0) / 1024)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self) -> Dict:
+        return {
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "stages": [{"stage": k, **{f: round(x, 3) for f, x in v.items()
+                                       if self.trace_memory or f not in ("alloc_kb", "peak_kb")}}
+                       for k, v in self.stages.items()],
+            "counters": dict(self.counters),
+            "cprofile": self.cprofile_out if self._prof is not None else None,
+        }
+
+    def report(self, fmt: str = "text", out: Optional[str] = None) -> None:
+        if not self.enabled:
+            return
+        data = self.as_dict()
+        if self._prof is not None:
+            self._prof.dump_stats(self.cprofile_out)
+        if fmt == "json":
+            text = json.dumps(data, indent=1) + "\n"
+        else:
+            lines = [f"[timings] {'stage':<22} {'calls':>5} {'wall ms':>10}"
+                     + (f" {'alloc KB':>10} {'peak KB':>10}" if self.trace_memory else "")]
+            for s in data["stages"]:
+                label = "  " * int(s["depth"]) + s["stage"]
+                row = f"[timings] {label:<22} {s['calls']:>5} {s['wall_ms']:>10.2f}"
+                if self.trace_memory and s["depth"] == 0:
+                    row += f" {s['alloc_kb']:>10.1f} {s['peak_kb']:>10.1f}"
+                lines.append(row)
+            lines.append(f"[timings] total {data['total_ms']:.2f} ms")
+            if data["counters"]:
+                lines.append("[timings] " + " ".join(f"{k}={v}" for k, v in data["counters"].items()))
+            if data["cprofile"]:
+                lines.append(f"[timings] cProfile of '{self.cprofile_stage}' written to {data['cprofile']}")
+            text = "\n".join(lines) + "\n"
+        if out:
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+
+NULL_TIMINGS = Timings(enabled=False)
+
+def add_cli_options(ap) -> None:
+    """The --timings/--profile options, shared by both scripts."""
+    ap.add_argument("--timings", nargs="?", const="text", choices=("text", "json"),
+                    help="Report per-stage wall time and counters (text, or json)")
+    ap.add_argument("--profile", action="store_true",
+                    help="Like --timings, plus per-stage allocations via tracemalloc (slower)")
+    ap.add_argument("--timings-out", help="Write the timings report to this file instead of stdout")
+    ap.add_argument("--cprofile", metavar="STAGE", help="Run this stage under cProfile")
+    ap.add_argument("--cprofile-out", help="cProfile dump path (default <STAGE>.prof)")
+
+def from_args(args) -> Timings:
+    enabled = bool(args.timings or args.profile or args.cprofile)
+    return Timings(enabled=enabled, trace_memory=args.profile,
+                   cprofile_stage=args.cprofile, cprofile_out=args.cprofile_out)
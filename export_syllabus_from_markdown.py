@@ -1,21 +1,104 @@
 #!/usr/bin/env python3
-import sys
+"""
+export_syllabus_from_markdown.py
 
-START = "<!-- Schedule Start -->"
-END = "<!-- Schedule End -->"
+Pulls `<!-- Name Start -->` ... `<!-- Name End -->` regions out of the syllabus Rmd.
 
-if len(sys.argv) != 2:
-    sys.exit(f"Usage: {sys.argv[0]} <markdown_file>")
+- The file is read line by line, and reading stops at the end marker of the last
+  requested region.
+- Any number of regions (schedule, logistics, resources, ...) are extracted in that one
+  pass; marker names are case-insensitive.
+- --region NAME=PATH writes a region to its own file, left untouched when the content is
+  unchanged; --region NAME (or no --region: the schedule) prints it.
+- --build OUT hands the schedule region to build_schedule.main in memory, with no
+  intermediate schedule_bib.md.
 
-with open(sys.argv[1], "r", encoding="utf-8") as f:
-    text = f.read()
+    python export_syllabus_from_markdown.py syllabus.Rmd > content/schedule_bib.md
+    python export_syllabus_from_markdown.py syllabus.Rmd --region schedule=content/schedule_bib.md \\
+        --region logistics=content/logistics_body.md
+    python export_syllabus_from_markdown.py syllabus.Rmd --build content/schedule.md --bib content/bib/grad_methods.bib
+"""
+import argparse, io, re, sys
+from typing import Dict, Iterable, List, Optional, Tuple
 
-start_idx = text.find(START)
-end_idx = text.find(END)
+import buildcache
 
-if start_idx == -1 or end_idx == -1 or end_idx <= start_idx:
-    sys.exit("Schedule markers not found or out of order.")
+MARKER_RE = re.compile(r"<!--\s*([A-Za-z][\w-]*(?:\s+[\w-]+)*?)\s+(Start|End)\s*-->", re.IGNORECASE)
+DEFAULT_REGION = "schedule"
 
-start_idx += len(START)
+def extract_regions(lines: Iterable[str], names: Iterable[str]) -> Dict[str, str]:
+    """{name: stripped text between its Start and End markers} for each wanted name found.
 
-print(text[start_idx:end_idx].strip())
\ No newline at end of file
+    Consumes lines only until every wanted region has ended."""
+    wanted = {n.lower() for n in names}
+    active: Dict[str, List[str]] = {}
+    done: Dict[str, str] = {}
+    for line in lines:
+        starts = dict.fromkeys(active, 0)  # where each open region's text begins on this line
+        for m in MARKER_RE.finditer(line):
+            name, edge = m.group(1).lower(), m.group(2).lower()
+            if name not in wanted:
+                continue
+            if edge == "start" and name not in active and name not in done:
+                active[name] = []
+                starts[name] = m.end()
+            elif edge == "end" and name in active:
+                active[name].append(line[starts.pop(name):m.start()])
+                done[name] = "".join(active.pop(name)).strip()
+        for name, buf in active.items():
+            buf.append(line[starts[name]:])
+        if len(done) == len(wanted):
+            break
+    return done
+
+def read_regions(path: str, names: Iterable[str]) -> Dict[str, str]:
+    """extract_regions over a file; exits if a region is missing or unterminated."""
+    names = list(names)
+    with open(path, "r", encoding="utf-8") as f:
+        regions = extract_regions(f, names)
+    missing = [n for n in names if n.lower() not in regions]
+    if missing:
+        sys.exit(f"[error] region markers not found or out of order: {', '.join(missing)}")
+    return regions
+
+def parse_region_arg(arg: str) -> Tuple[str, Optional[str]]:
+    name, sep, path = arg.partition("=")
+    return name.strip().lower(), (path.strip() or None) if sep else None
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract marked regions (schedule, logistics, ...) from the syllabus Rmd.")
+    ap.add_argument("markdown_file", help="Syllabus .Rmd/.md with <!-- Name Start --> / <!-- Name End --> markers")
+    ap.add_argument("--region", action="append", default=[], metavar="NAME[=PATH]",
+                    help="Region to extract, written to PATH (only if changed) or printed (repeatable; default: schedule)")
+    ap.add_argument("--build", metavar="OUT", help="Build OUT from the schedule region with build_schedule.py, in memory")
+    ap.add_argument("--build-region", default=DEFAULT_REGION, help="Region --build uses (default schedule)")
+    ap.add_argument("--bib", help="--build: path to .bib")
+    ap.add_argument("--start", default="2026-01-21", help="--build: start Wednesday YYYY-MM-DD (default 2026-01-21)")
+    ap.add_argument("--tz", default="America/Chicago", help="--build: IANA timezone (default America/Chicago)")
+    ap.add_argument("--refs", default="inline", help="--build: build_schedule.py --refs mode (default inline)")
+    args = ap.parse_args()
+    if args.build and not args.bib:
+        ap.error("--build needs --bib")
+
+    targets = [parse_region_arg(r) for r in args.region]
+    if not targets and not args.build:
+        targets = [(DEFAULT_REGION, None)]
+    names = [n for n, _ in targets] + ([args.build_region.lower()] if args.build else [])
+    regions = read_regions(args.markdown_file, dict.fromkeys(names))
+
+    for name, path in targets:
+        text = regions[name] + "\n"
+        if path is None:
+            sys.stdout.write(text)
+        elif buildcache.write_text_if_changed(path, text):
+            print(f"[done] wrote {path} ({name})", file=sys.stderr)
+        else:
+            print(f"[done] {path} unchanged ({name})", file=sys.stderr)
+
+    if args.build:
+        import build_schedule
+        build_schedule.main(io.StringIO(regions[args.build_region.lower()] + "\n"), args.build, args.bib,
+                            args.tz, args.start, args.refs)
+
+if __name__ == "__main__":
+    main()
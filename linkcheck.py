@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+linkcheck.py
+
+Checks the DOI/URL links of cited references (build_schedule.py --check-links).
+
+- Links are grouped by host and the groups are checked concurrently on a bounded thread
+  pool; each worker keeps one keep-alive connection per host it talks to.
+- Requests to the same host are spaced by a shared per-host rate limit, including hosts
+  reached through redirects (e.g. every DOI's publisher behind doi.org).
+- HEAD first, GET when the server refuses HEAD; redirects are followed by hand so
+  permanent moves (301/308) can be reported.
+- Results are cached in .cache/linkcheck.json with a TTL, so a rebuild only re-checks stale
+  links. Network errors are reported but not cached.
+
+Statuses: ok, moved (reachable through a permanent redirect), dead (4xx/5xx), unverified
+(401/403/429: the server would not say), error (no HTTP answer).
+
+    python linkcheck.py https://doi.org/10.1037/xge0000123 http://localhost:8000/page
+"""
+import argparse, http.client, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import buildcache
+
+CACHE_FILE = "linkcheck.json"
+DEFAULT_TTL_HOURS = 168.0
+DEFAULT_JOBS = 8
+DEFAULT_RATE = 2.0  # requests per second per host
+MAX_REDIRECTS = 10
+TIMEOUT = 10.0
+PERMANENT_REDIRECTS = (301, 308)
+UNVERIFIED = (401, 403, 429)
+HEADERS = {"User-Agent": "grad-methods-linkcheck/1.0 (+course site build)", "Accept": "*/*"}
+
+class LinkResult(NamedTuple):
+    url: str
+    status: str     # ok | moved | dead | unverified | error
+    code: int       # last HTTP status (0: none)
+    final: str      # URL after redirects
+    detail: str = ""
+    checked: float = 0.0
+
+# ---------------- Connections ----------------
+class HostRateLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate: float = DEFAULT_RATE):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class Session:
+    """Keep-alive connections of one worker, one per (scheme, host)."""
+
+    def __init__(self, limiter: HostRateLimiter, timeout: float = TIMEOUT):
+        self.limiter = limiter
+        self.timeout = timeout
+        self._conns: Dict[Tuple[str, str], http.client.HTTPConnection] = {}
+
+    def _conn(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conn = self._conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = self._conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+        return conn
+
+    def request(self, method: str, url: str) -> Tuple[int, Optional[str]]:
+        """(status, Location header) for one request; retries once on a dropped keep-alive connection."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"unsupported URL: {url}")
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        for attempt in (0, 1):
+            conn = self._conn(parts.scheme, parts.netloc)
+            self.limiter.wait(parts.netloc)
+            try:
+                conn.request(method, target, headers=HEADERS)
+                resp = conn.getresponse()
+                if method == "HEAD":
+                    resp.read()
+                else:
+                    resp.close()  # don't download bodies; the connection is reopened next time
+                    self._drop(parts.scheme, parts.netloc)
+                return resp.status, resp.getheader("Location")
+            except (http.client.HTTPException, ConnectionError):
+                self._drop(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def _drop(self, scheme: str, netloc: str) -> None:
+        conn = self._conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close(self) -> None:
+        for conn in self._conns.values():
+            conn.close()
+        self._conns.clear()
+
+# ---------------- Checking ----------------
+def check_url(session: Session, url: str) -> LinkResult:
+    current, moved, code = url, False, 0
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            code, location = session.request("HEAD", current)
+            if code in (405, 501) or (code in UNVERIFIED and code != 429):
+                code, location = session.request("GET", current)  # some servers only answer GET
+            if 300 <= code < 400 and location:
+                moved = moved or code in PERMANENT_REDIRECTS
+                current = urljoin(current, location)
+                continue
+            break
+        else:
+            return LinkResult(url, "dead", code, current, "too many redirects", time.time())
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        return LinkResult(url, "error", code, current, f"{type(e).__name__}: {e}", time.time())
+    if 200 <= code < 300:
+        status = "moved" if moved else "ok"
+    elif code in UNVERIFIED:
+        status = "unverified"
+    else:
+        status = "dead"
+    return LinkResult(url, status, code, current, "", time.time())
+
+def _check_group(urls: List[str], limiter: HostRateLimiter, timeout: float) -> List[LinkResult]:
+    session = Session(limiter, timeout)
+    try:
+        return [check_url(session, u) for u in urls]
+    finally:
+        session.close()
+
+def load_cache(cache_dir: str) -> Dict[str, LinkResult]:
+    try:
+        with open(os.path.join(cache_dir, CACHE_FILE), "r", encoding="utf-8") as f:
+            return {url: LinkResult(*rec) for url, rec in json.load(f).items()}
+    except (OSError, ValueError, TypeError):
+        return {}
+
+def check_links(urls: Iterable[str], cache_dir: str = buildcache.CACHE_DIR, ttl_hours: float = DEFAULT_TTL_HOURS,
+                jobs: int = DEFAULT_JOBS, rate: float = DEFAULT_RATE, timeout: float = TIMEOUT,
+                use_cache: bool = True) -> Dict[str, LinkResult]:
+    """{url: LinkResult}; only links missing from the cache or older than ttl_hours are fetched."""
+    urls = sorted(set(u for u in urls if u))
+    cache = load_cache(cache_dir) if use_cache else {}
+    now = time.time()
+    results = {u: cache[u] for u in urls if u in cache and now - cache[u].checked < ttl_hours * 3600}
+    stale = [u for u in urls if u not in results]
+    groups: Dict[str, List[str]] = {}
+    for u in stale:
+        groups.setdefault(urlsplit(u).netloc.lower(), []).append(u)
+    if groups:
+        limiter = HostRateLimiter(rate)
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(groups)))) as pool:
+            for batch in pool.map(lambda g: _check_group(g, limiter, timeout), groups.values()):
+                for r in batch:
+                    results[r.url] = r
+    if use_cache and stale:
+        cache.update((u, results[u]) for u in stale if results[u].status != "error")
+        buildcache.atomic_write_bytes(os.path.join(cache_dir, CACHE_FILE),
+                                      json.dumps({u: list(r) for u, r in sorted(cache.items())}, indent=1).encode("utf-8"))
+    return results
+
+def report(results: Dict[str, LinkResult], owners: Optional[Dict[str, List[str]]] = None) -> int:
+    """Print the links that need attention; return how many there were."""
+    bad = 0
+    for url in sorted(results):
+        r = results[url]
+        if r.status == "ok":
+            continue
+        bad += 1
+        who = f" ({', '.join(sorted(owners[url]))})" if owners and url in owners else ""
+        if r.status == "moved":
+            print(f"[warn] moved link{who}: {url} -> {r.final}")
+        else:
+            detail = r.detail or f"HTTP {r.code}"
+            print(f"[warn] {r.status} link{who}: {url} [{detail}]")
+    counts = {}
+    for r in results.values():
+        counts[r.status] = counts.get(r.status, 0) + 1
+    print(f"[links] checked {len(results)}: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser(description="Check links (with the same cache and limits as build_schedule.py --check-links).")
+    ap.add_argument("urls", nargs="+", help="URLs to check")
+    ap.add_argument("--cache-dir", default=buildcache.CACHE_DIR, help="Cache directory (default .cache)")
+    ap.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_HOURS, help=f"Re-check cached results older than this (default {DEFAULT_TTL_HOURS:g})")
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help=f"Hosts checked at once (default {DEFAULT_JOBS})")
+    ap.add_argument("--rate", type=float, default=DEFAULT_RATE, help=f"Requests per second per host (default {DEFAULT_RATE:g})")
+    ap.add_argument("--no-cache", action="store_true", help="Ignore and don't update the result cache")
+    args = ap.parse_args()
+    results = check_links(args.urls, args.cache_dir, args.ttl_hours, args.jobs, args.rate, use_cache=not args.no_cache)
+    raise SystemExit(1 if report(results) else 0)
+
+if __name__ == "__main__":
+    main()
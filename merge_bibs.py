@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+merge_bibs.py
+
+Merges several .bib files into one without duplicate works, plus a key-alias map.
+
+- Files are read in priority order (as with repeated --bib); the first copy of a work is
+  kept verbatim and later copies become aliases of its key.
+- Duplicates are found in one pass with two hash indexes: normalized DOI, and normalized
+  title + year + first author's family name. Each entry costs a couple of dict lookups, so
+  the merge is linear in the number of entries.
+- A title/year/author match is not taken when both entries have (different) DOIs, since an
+  erratum or a reprint can share all three. Matches without a DOI to confirm them are
+  reported separately; --doi-only turns them off.
+- A key that reappears later for a different work is dropped (the earlier file wins) and
+  reported.
+- crossref/xref/xdata/related/entryset links of kept entries are rewritten through the alias
+  map, so a child whose parent was merged away follows it to the kept copy. Links that still
+  point at no kept entry (a shadowed or absent parent) are reported.
+- @string/@preamble/@comment blocks are kept only from files with at least one kept entry.
+  @string macros are deduplicated by name, the earlier file winning; a later file that
+  defines the same macro differently is reported, since its kept entries will read the
+  earlier value.
+- The alias map ({alias: canonical key}, JSON) is what build_schedule.py --aliases and
+  prune_bib_old.py --aliases read, so citations of either key resolve to one entry.
+
+    python merge_bibs.py content/bib/grad_methods.bib public/bib/cogsci_llms_pruned.bib \\
+        --out content/bib/merged.bib --aliases-out content/bib/merged.aliases.json
+"""
+import argparse, json, os, re, sys, unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import bibtools
+import buildcache
+import buildtimings
+
+DOI_PREFIX_RE = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+LATEX_CMD_RE = re.compile(r"\\[A-Za-z]+\*?")
+WORD_RE = re.compile(r"[^\W_]+")
+YEAR_RE = re.compile(r"\d{4}")
+TITLE_MATCH = "title+year+author"
+TITLE_ONLY_SHOWN = 10
+
+class Duplicate(NamedTuple):
+    key: str
+    path: str
+    canonical: str
+    how: str  # doi | title+year+author | same key
+
+class MergeResult(NamedTuple):
+    blocks: List[str]           # kept entries, in file order
+    specials: List[str]         # @string/@preamble/@comment blocks of files with kept entries
+    aliases: Dict[str, str]     # alias key -> canonical key
+    duplicates: List[Duplicate]
+    shadowed: List[Tuple[str, str]]  # (key, path): same key, different work, dropped
+    broken_links: List[Tuple[str, str, str]]  # (key, field, target): kept entry linking to no kept entry
+    macro_conflicts: List[Tuple[str, str, str, List[str]]]  # (macro, path, earlier path, keys using it)
+
+    @property
+    def title_only(self) -> List[Duplicate]:
+        """Aliases matched on title, year and first author with no DOI to confirm them."""
+        return [d for d in self.duplicates if d.how == TITLE_MATCH]
+
+# ---------------- Normalization ----------------
+def _plain(text: str) -> str:
+    """Lower-case words with LaTeX, braces, accents and punctuation removed."""
+    text = LATEX_CMD_RE.sub(" ", bibtools.normalize_name(text))
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(WORD_RE.findall(text.casefold()))
+
+def normalize_doi(value: str) -> str:
+    """10.xxxx/... in lower case ("" when value is not a DOI or doi.org link)."""
+    doi = DOI_PREFIX_RE.sub("", value.strip().replace("{", "").replace("}", "")).strip().rstrip(".").lower()
+    return doi if doi.startswith("10.") and "/" in doi else ""
+
+def entry_doi(fields: Dict[str, str]) -> str:
+    return normalize_doi(fields.get("doi", "")) or normalize_doi(fields.get("url", ""))
+
+def work_key(fields: Dict[str, str]) -> Optional[str]:
+    """title|year|first author's family name, normalized; None without a title."""
+    title = _plain(fields.get("title", ""))
+    if not title:
+        return None
+    year = YEAR_RE.search(fields.get("year") or fields.get("date") or "")
+    people = (fields.get("author") or fields.get("editor") or "").split(" and ")
+    first = _plain(bibtools.family_name(people[0])) if people[0].strip() else ""
+    return f"{title}|{year.group() if year else ''}|{first}"
+
+# ---------------- Merge ----------------
+def merge(paths: List[str], timings: buildtimings.Timings = buildtimings.NULL_TIMINGS,
+          doi_only: bool = False) -> MergeResult:
+    """Merge paths (highest priority first); doi_only: don't match on title/year/author."""
+    by_doi: Dict[str, str] = {}
+    by_work: Dict[str, str] = {}
+    kept: Dict[str, Tuple[str, Optional[str]]] = {}  # key -> (doi, work key) of the kept entry
+    origins: List[str] = []  # path of each kept block
+    links: Dict[int, List[Tuple[str, str]]] = {}  # kept block index -> its (field, target) links
+    strings: Dict[str, Tuple[str, str]] = {}  # macro -> (value, path) of the definition written out
+    result = MergeResult([], [], {}, [], [], [], [])
+    for path in paths:
+        with timings.stage("read"):
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        with timings.stage("dedupe"):
+            macros: Dict[str, str] = {}
+            specials: List[Tuple[str, Optional[Dict[str, str]]]] = []  # (block, macros it defines)
+            n_kept = len(result.blocks)
+            for raw in bibtools.scan_entries(text):
+                block = text[raw.start:raw.end]
+                if raw.type == "string":
+                    defined = bibtools.entry_fields(text, raw, macros)
+                    macros.update(defined)
+                    specials.append((block, defined))
+                    continue
+                if raw.type in bibtools.SPECIAL_TYPES or not raw.key:
+                    specials.append((block, None))
+                    continue
+                fields = bibtools.entry_fields(text, raw, macros)
+                doi, work = entry_doi(fields), work_key(fields)
+                canonical, how = (by_doi.get(doi), "doi") if doi else (None, "")
+                if canonical is None and work is not None and not doi_only:
+                    canonical, how = by_work.get(work), TITLE_MATCH
+                    if canonical is not None and doi and kept[canonical][0]:
+                        canonical = None  # different DOIs: an erratum, reprint, ... of the same title
+                if raw.key in kept:
+                    if canonical == raw.key or kept[raw.key] == (doi, work):
+                        result.duplicates.append(Duplicate(raw.key, path, raw.key, "same key"))
+                    else:
+                        result.shadowed.append((raw.key, path))
+                    continue
+                if canonical is not None:
+                    result.aliases[raw.key] = canonical
+                    result.duplicates.append(Duplicate(raw.key, path, canonical, how))
+                    continue
+                kept[raw.key] = (doi, work)
+                if doi: by_doi.setdefault(doi, raw.key)
+                if work is not None: by_work.setdefault(work, raw.key)
+                linked = [(name, t.strip()) for name in bibtools.LINK_FIELDS
+                          for t in fields.get(name, "").split(",") if t.strip()]
+                if linked:
+                    links[len(result.blocks)] = linked
+                result.blocks.append(block)
+                origins.append(path)
+            if len(result.blocks) > n_kept:
+                _add_specials(result, specials, strings, path, result.blocks[n_kept:])
+    timings.count("entries_read", len(kept) + len(result.duplicates) + len(result.shadowed))
+    # an alias that is also some kept entry's key would be ambiguous; the entry wins
+    for key in [k for k in result.aliases if k in kept]:
+        del result.aliases[key]
+    with timings.stage("links"):
+        shadowed = set(result.shadowed)
+        for i, linked in links.items():
+            if any(t in result.aliases for _, t in linked):
+                result.blocks[i] = bibtools.rewrite_links(result.blocks[i], result.aliases)
+            for name, target in linked:
+                target = result.aliases.get(target, target)
+                # a parent shadowed in the child's own file was replaced by a different work
+                if target not in kept or (target, origins[i]) in shadowed:
+                    key = next(bibtools.scan_entries(result.blocks[i])).key
+                    result.broken_links.append((key, name, target))
+    return result
+
+def _add_specials(result: MergeResult, specials: List[Tuple[str, Optional[Dict[str, str]]]],
+                  strings: Dict[str, Tuple[str, str]], path: str, blocks: List[str]) -> None:
+    """Append one file's specials; @string macros already written are skipped, or reported with the
+    file's kept entries (blocks) that use them if the values differ."""
+    conflicted = False
+    for block, defined in specials:
+        if defined is None:
+            result.specials.append(block)
+            continue
+        new = {}
+        for name, value in defined.items():
+            if name not in strings:
+                new[name] = value
+            elif strings[name][0] != value:
+                conflicted = True
+                uses = re.compile(r"[=#]\s*" + re.escape(name) + r"\s*(?:[,#})]|$)", re.IGNORECASE | re.MULTILINE)
+                users = [next(bibtools.scan_entries(b)).key for b in blocks if uses.search(b)]
+                result.macro_conflicts.append((name, path, strings[name][1], users))
+        if len(new) == len(defined) and not conflicted:
+            result.specials.append(block)
+        elif new:
+            # verbatim, the block would redefine a macro (or read one whose value differs here)
+            result.specials.extend(f"@string{{{name} = {{{value}}}}}" for name, value in new.items())
+        strings.update((name, (value, path)) for name, value in new.items())
+
+def write_report(out_path: str, merged: MergeResult) -> None:
+    lines = [f"# {len(merged.blocks)} kept, {len(merged.aliases)} aliases, {len(merged.shadowed)} shadowed"]
+    for d in merged.duplicates:
+        if d.how != "same key":
+            kind = "title-only" if d.how == TITLE_MATCH else "alias"
+            lines.append(f"{kind}\t{d.key}\t{d.canonical}\t{d.how}\t{d.path}")
+    for key, path in merged.shadowed:
+        lines.append(f"shadowed\t{key}\t\t\t{path}")
+    for key, name, target in merged.broken_links:
+        lines.append(f"broken-link\t{key}\t{target}\t{name}\t")
+    for name, path, first, users in merged.macro_conflicts:
+        lines.append(f"macro-conflict\t{name}\t{','.join(users)}\t{first}\t{path}")
+    text = "\n".join(lines) + "\n"
+    if out_path == "-":
+        sys.stdout.write(text)
+    else:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge .bib files (highest priority first), dropping duplicate works, and write a key-alias map.")
+    ap.add_argument("bibs", nargs="+", help=".bib files, highest priority first")
+    ap.add_argument("--out", required=True, help="Merged .bib to write")
+    ap.add_argument("--aliases-out", help="JSON alias map to write (default: --out with .aliases.json)")
+    ap.add_argument("--report", nargs="?", const="-", metavar="FILE",
+                    help="List every alias (with how it matched), shadowed key, broken link and conflicting @string (to FILE, or stdout)")
+    ap.add_argument("--doi-only", action="store_true",
+                    help="Only merge entries with the same DOI (no title/year/first-author matching)")
+    buildtimings.add_cli_options(ap)
+    args = ap.parse_args()
+    timings = buildtimings.from_args(args)
+    for p in args.bibs:
+        if not os.path.exists(p): raise SystemExit(f"[error] bib not found: {p}")
+    aliases_out = args.aliases_out or os.path.splitext(args.out)[0] + ".aliases.json"
+
+    merged = merge(args.bibs, timings, args.doi_only)
+    with timings.stage("write"):
+        bibtools.write_bib(args.out, merged.blocks, merged.specials)
+        changed = buildcache.write_text_if_changed(
+            aliases_out, json.dumps(merged.aliases, ensure_ascii=False, indent=1, sort_keys=True) + "\n")
+    print(f"[done] wrote {args.out}: {len(merged.blocks)} entries from {len(args.bibs)} files, "
+          f"{len(merged.duplicates)} duplicates dropped")
+    print(f"[done] {'wrote' if changed else 'unchanged'} {aliases_out} ({len(merged.aliases)} aliases)")
+    for key, path in merged.shadowed:
+        print(f"[warn] key {key} in {path} names a different work than the earlier entry; dropped")
+    title_only = merged.title_only
+    if title_only:
+        print(f"[warn] {len(title_only)} aliases matched on title, year and first author only (no DOI to confirm); "
+              f"check they are not errata or reprints, or use --doi-only")
+        for d in title_only[:TITLE_ONLY_SHOWN]:
+            print(f"[warn]   {d.key} -> {d.canonical} ({d.path})")
+        if len(title_only) > TITLE_ONLY_SHOWN:
+            print(f"[warn]   ... {len(title_only) - TITLE_ONLY_SHOWN} more (--report lists them all)")
+    for key, name, target in merged.broken_links:
+        print(f"[warn] {key}: {name} {target} is not in the merged bib")
+    for name, path, first, users in merged.macro_conflicts:
+        who = f"; {len(users)} kept entries use it: {', '.join(users[:TITLE_ONLY_SHOWN])}" if users else ""
+        print(f"[warn] @string {name} in {path} differs from the one in {first} (kept){who}")
+    if args.report:
+        write_report(args.report, merged)
+    timings.count("aliases", len(merged.aliases))
+    timings.count("shadowed", len(merged.shadowed))
+    timings.report(args.timings or "text", args.timings_out)
+
+if __name__ == "__main__":
+    main()
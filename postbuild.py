@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+postbuild.py
+
+Post-build stage for the generated site (run on public/ after `hugo`, before deploying).
+
+- Static assets (images, CSS, JS, fonts) that pages reference are renamed to content-hashed
+  names (images/header.jpg -> images/header.1f0c9a2b7d.jpg) and every reference in the HTML,
+  XML and CSS is rewritten. The hashed files are listed in public/_headers (Netlify) with
+  `Cache-Control: immutable`, so repeat visits never re-fetch them.
+- PDFs, .bib downloads and pages keep their names (they are linked from outside), but like
+  all text-like files they get precompressed .gz siblings (and .br when the brotli module is
+  installed), written in parallel on a process pool. A sibling is only kept if it is at least
+  --min-saving smaller than the file.
+- .cache/postbuild.json remembers each file's hash and siblings: a file whose hash is unchanged
+  since the last run is not compressed again. Siblings of files that disappeared are removed.
+
+    hugo --gc --minify && python postbuild.py public
+"""
+import argparse, gzip, json, os, posixpath, re, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import buildcache
+import buildtimings
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+STATE = "postbuild.json"
+STATE_VERSION = 1
+HASH_LEN = 10
+HASHED_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif", ".svg", ".ico",
+               ".css", ".js", ".woff", ".woff2", ".ttf", ".otf")
+REWRITE_EXTS = (".html", ".xml", ".css")
+COMPRESS_EXTS = (".html", ".xml", ".css", ".js", ".json", ".svg", ".txt", ".md", ".bib", ".pdf",
+                 ".ico", ".ttf", ".otf", ".webmanifest")
+KEEP_NAMES = ("/favicon.ico",)  # fetched by browsers at a fixed URL
+SIBLINGS = (".gz", ".br")
+HEADERS_FILE = "_headers"
+IMMUTABLE = "public, max-age=31536000, immutable"
+DEFAULT_MIN_SAVING = 0.05
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{%d}(?=\.[^.]+$)" % HASH_LEN)
+
+# ---------------- Files ----------------
+def site_files(root: str) -> Iterator[str]:
+    """Site paths (/images/header.jpg) of every file under root, except our own outputs."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(SIBLINGS) or (name == HEADERS_FILE and dirpath == root):
+                continue
+            rel = os.path.relpath(os.path.join(dirpath, name), root)
+            yield "/" + rel.replace(os.sep, "/")
+
+def local(root: str, site_path: str) -> str:
+    return os.path.join(root, *site_path.lstrip("/").split("/"))
+
+def hashed_name(site_path: str, digest: str) -> str:
+    stem, ext = posixpath.splitext(site_path)
+    return f"{stem}.{digest[:HASH_LEN]}{ext}"
+
+# ---------------- References ----------------
+def reference_re(names: List[str]) -> "re.Pattern":
+    """URL-ish runs ending in one of the asset file names (quoted, unquoted, or HTML-escaped in XML)."""
+    alts = "|".join(re.escape(n) for n in sorted(set(names), key=len, reverse=True))
+    return re.compile(r"(?P<prefix>[\w./~%:-]*?)(?P<name>" + alts + r")(?![\w.-])")
+
+def resolve(doc: str, url: str) -> Optional[str]:
+    """Site path a reference in the page at site path doc points to (None for other hosts)."""
+    if "://" in url or url.startswith("//"):
+        return None
+    base = posixpath.dirname(doc)  # /schedule/index.html is served as /schedule/
+    return posixpath.normpath(url if url.startswith("/") else posixpath.join(base, url))
+
+def find_refs(text: str, doc: str, pattern: "re.Pattern") -> Iterator[str]:
+    """Site paths of the assets the page at site path doc references."""
+    for m in pattern.finditer(text):
+        target = resolve(doc, m.group("prefix") + m.group("name"))
+        if target is not None:
+            yield target
+
+def rewrite_refs(text: str, doc: str, pattern: "re.Pattern", renamed: Dict[str, str]) -> Tuple[str, int]:
+    """Replace references to renamed assets; return (text, replacements)."""
+    n = 0
+    def sub(m: "re.Match") -> str:
+        nonlocal n
+        target = resolve(doc, m.group("prefix") + m.group("name"))
+        if target not in renamed:
+            return m.group()
+        n += 1
+        return m.group("prefix") + posixpath.basename(renamed[target])
+    return pattern.sub(sub, text), n
+
+# ---------------- Compression ----------------
+def compress_file(path: str, min_saving: float) -> Tuple[str, Dict[str, int]]:
+    """Write the .gz (and .br) siblings of path that are worth keeping; return {suffix: bytes}."""
+    with open(path, "rb") as f:
+        data = f.read()
+    packers = [(".gz", lambda b: gzip.compress(b, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        packers.append((".br", lambda b: brotli.compress(b, quality=11)))
+    kept: Dict[str, int] = {}
+    for suffix, pack in packers:
+        packed = pack(data)
+        if len(packed) <= len(data) * (1 - min_saving):
+            buildcache.atomic_write_bytes(path + suffix, packed)
+            kept[suffix] = len(packed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return path, kept
+
+def load_state(cache_dir: str, root: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, STATE), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = None
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION or state.get("root") != os.path.abspath(root):
+        state = {"version": STATE_VERSION, "root": os.path.abspath(root), "assets": {}, "files": {}}
+    return state
+
+# ---------------- Stage ----------------
+def postbuild(root: str, cache_dir: str = buildcache.CACHE_DIR, jobs: Optional[int] = None,
+              hash_assets: bool = True, compress: bool = True, min_saving: float = DEFAULT_MIN_SAVING,
+              force: bool = False, timings: buildtimings.Timings = buildtimings.NULL_TIMINGS) -> dict:
+    """Run the stage over root; return counts for the report."""
+    state = {"version": STATE_VERSION, "root": os.path.abspath(root), "assets": {}, "files": {}} if force \
+        else load_state(cache_dir, root)
+    stats = {"renamed": 0, "refs_rewritten": 0, "pages_rewritten": 0, "compressed": 0, "skipped": 0,
+             "bytes_in": 0, "bytes_gz": 0}
+    with timings.stage("scan"):
+        files = list(site_files(root))
+    renamed: Dict[str, str] = {}
+    if hash_assets:
+        with timings.stage("hash_assets"):
+            present = set(files)
+            # an asset renamed by an earlier run on this tree: the page text may still name the original
+            for orig, hashed in state["assets"].items():
+                if orig not in present and hashed in present:
+                    renamed[orig] = hashed
+            candidates = [p for p in files if p.lower().endswith(HASHED_EXTS) and p not in KEEP_NAMES
+                          and not HASHED_NAME_RE.search(p)]
+            docs = [p for p in files if p.lower().endswith(REWRITE_EXTS)]
+            texts = {}
+            for d in docs:
+                with open(local(root, d), "r", encoding="utf-8", errors="surrogateescape") as f:
+                    texts[d] = f.read()
+            # only assets some page references are renamed; anything else may be fetched by its name
+            used = set()
+            if candidates:
+                pattern = reference_re([posixpath.basename(p) for p in candidates])
+                for d in docs:
+                    used.update(find_refs(texts[d], d, pattern))
+            for p in sorted(used.intersection(candidates)):
+                target = hashed_name(p, buildcache.sha256_file(local(root, p)))
+                src, dst = local(root, p), local(root, target)
+                if os.path.exists(dst):
+                    os.remove(src)
+                else:
+                    os.replace(src, dst)
+                old = state["assets"].get(p)
+                if old and old != target and os.path.exists(local(root, old)):
+                    os.remove(local(root, old))  # the previous version of this asset
+                    for suffix in SIBLINGS:
+                        if os.path.exists(local(root, old) + suffix): os.remove(local(root, old) + suffix)
+                renamed[p] = state["assets"][p] = target
+                stats["renamed"] += 1
+        with timings.stage("rewrite_refs"):
+            if renamed:
+                pattern = reference_re([posixpath.basename(p) for p in renamed])
+                for d in docs:
+                    text, n = rewrite_refs(texts[d], d, pattern, renamed)
+                    if n:
+                        with open(local(root, d), "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+                            f.write(text)
+                        stats["refs_rewritten"] += n
+                        stats["pages_rewritten"] += 1
+            headers = "".join(f"{hashed}\n  Cache-Control: {IMMUTABLE}\n" for hashed in sorted(set(renamed.values())))
+            if headers:
+                buildcache.write_text_if_changed(os.path.join(root, HEADERS_FILE),
+                                                 "# written by postbuild.py: content-hashed assets never change\n" + headers)
+        files = list(site_files(root))
+
+    if compress:
+        with timings.stage("hash_files"):
+            todo: List[str] = []
+            current: Dict[str, dict] = {}
+            for p in files:
+                if not p.lower().endswith(COMPRESS_EXTS):
+                    continue
+                path = local(root, p)
+                digest = buildcache.sha256_file(path)
+                rec = state["files"].get(p)
+                if rec and rec["sha256"] == digest and all(os.path.exists(path + s) for s in rec["siblings"]):
+                    current[p] = rec
+                    stats["skipped"] += 1
+                else:
+                    current[p] = {"sha256": digest, "siblings": []}
+                    todo.append(p)
+            # siblings of files that are gone
+            for p, rec in state["files"].items():
+                if p not in current:
+                    for s in rec["siblings"]:
+                        if os.path.exists(local(root, p) + s): os.remove(local(root, p) + s)
+        with timings.stage("compress"):
+            todo.sort(key=lambda p: -os.path.getsize(local(root, p)))  # big files first, for balance
+            if todo:
+                with ProcessPoolExecutor(max_workers=max(1, min(jobs or os.cpu_count() or 1, len(todo)))) as pool:
+                    futures = [pool.submit(compress_file, local(root, p), min_saving) for p in todo]
+                    for p, fut in zip(todo, futures):
+                        _, kept = fut.result()
+                        current[p]["siblings"] = sorted(kept)
+                        stats["compressed"] += 1
+                        stats["bytes_in"] += os.path.getsize(local(root, p))
+                        stats["bytes_gz"] += kept.get(".gz", os.path.getsize(local(root, p)))
+        state["files"] = current
+
+    buildcache.atomic_write_bytes(os.path.join(cache_dir, STATE), json.dumps(state, indent=1, sort_keys=True).encode("utf-8"))
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Hash-name static assets and precompress the built site (public/) for long-lived caching and smaller transfers.")
+    ap.add_argument("root", nargs="?", default="public", help="Built site directory (default public)")
+    ap.add_argument("--cache-dir", default=buildcache.CACHE_DIR, help="Where the per-file state is kept (default .cache)")
+    ap.add_argument("--jobs", type=int, help="Compression processes (default: CPU count)")
+    ap.add_argument("--no-hash", action="store_true", help="Keep asset names; only compress")
+    ap.add_argument("--no-compress", action="store_true", help="Only hash-name assets")
+    ap.add_argument("--min-saving", type=float, default=DEFAULT_MIN_SAVING,
+                    help=f"Keep a .gz/.br sibling only if it is at least this fraction smaller (default {DEFAULT_MIN_SAVING:g})")
+    ap.add_argument("--force", action="store_true", help="Ignore the saved state: recompress everything")
+    buildtimings.add_cli_options(ap)
+    args = ap.parse_args()
+    if not os.path.isdir(args.root): raise SystemExit(f"[error] not a directory: {args.root}")
+    timings = buildtimings.from_args(args)
+
+    t0 = time.perf_counter()
+    stats = postbuild(args.root, args.cache_dir, args.jobs, not args.no_hash, not args.no_compress,
+                      args.min_saving, args.force, timings)
+    print(f"[done] {args.root}: {stats['renamed']} assets hash-named, {stats['refs_rewritten']} references "
+          f"rewritten in {stats['pages_rewritten']} files")
+    if not args.no_compress:
+        codecs = ".gz/.br" if brotli is not None else ".gz (install brotli for .br)"
+        print(f"[done] compressed {stats['compressed']} files ({codecs}), {stats['skipped']} unchanged; "
+              f"{stats['bytes_in'] / 1024:.0f} KB -> {stats['bytes_gz'] / 1024:.0f} KB gzip "
+              f"[{(time.perf_counter() - t0) * 1000:.0f} ms]")
+    for name, n in stats.items():
+        timings.count(name, n)
+    timings.report(args.timings or "text", args.timings_out)
+
+if __name__ == "__main__":
+    main()
@@ -1,179 +1,290 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
+import mmap
 import os
-import re
-from typing import Set, Dict, Tuple, List
-
-CITE_RE = re.compile(
-    r"""(?x)
-    (?:
-        (?<![A-Za-z0-9_@])       # don't match emails/usernames
-        @([A-Za-z0-9_:+./-]+)    # @Key style
-    )
-    |
-    (?:
-        \\cite[t|p|author|year]*\s*  # \cite, \citet, \citep, etc.
-        \{([^\}]+)\}                 # keys inside braces, comma-separated
-    )
-    """
-)
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Set, Dict, Tuple, List, Optional
+
+import bibtools
+import buildtimings
+import keysuggest
+
+CITE_RE = bibtools.CITE_RE  # shared with build_schedule.py
 
 def extract_keys_from_text(text: str) -> Set[str]:
-    keys: Set[str] = set()
-    for m in CITE_RE.finditer(text):
-        g1, g2 = m.groups()
-        if g1:
-            k = g1.strip().rstrip('.,;:)]}')
-            if k:
-                keys.add(k)
-        elif g2:
-            # split comma-separated keys from \cite{a,b,c}
-            for raw in g2.split(","):
-                k = raw.strip().rstrip('.,;:)]}')
-                if k:
-                    keys.add(k)
-    return keys
+    return bibtools.cited_keys(text)
 
 def read_file(path: str) -> str:
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
-def find_bib_blocks(bib_text: str) -> Tuple[Dict[str, str], List[str]]:
+def _keys_in_file(path: str) -> Optional[Set[str]]:
+    return extract_keys_from_text(read_file(path)) if os.path.exists(path) else None
+
+def collect_cited(paths: List[str], jobs: Optional[int] = None) -> Set[str]:
+    """Union of the citekeys in all files, read and scanned on a thread pool (missing files are skipped)."""
+    cited: Set[str] = set()
+    if len(paths) > 1 and jobs != 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            found = list(pool.map(_keys_in_file, paths))
+    else:
+        found = [_keys_in_file(p) for p in paths]
+    for path, keys in zip(paths, found):
+        if keys is None:
+            print(f"[warn] missing file (skipped): {path}")
+        else:
+            cited |= keys
+    return cited
+
+Links = Dict[str, List[Tuple[str, str]]]  # citekey -> [(field, linked key), ...]
+
+def find_bib_blocks(bib_text: str, links: Optional[Links] = None) -> Tuple[Dict[str, str], List[str]]:
     """
     Parse a .bib into entry blocks keyed by citekey.
     Also return a list of special blocks like @string and @preamble to keep verbatim.
-    Parsing approach: scan for top-level '@' and read until the matching closing brace.
+    Parsing approach: bibtools.scan_entries finds each top-level '@' and its matching closing brace.
+    If `links` is given, it is filled with each linking entry's crossref/xref/xdata/related/entryset
+    targets during the same scan.
     """
     entries: Dict[str, str] = {}
     specials: List[str] = []
-    i, n = 0, len(bib_text)
-
-    while i < n:
-        at = bib_text.find('@', i)
-        if at == -1:
-            break
-        # find entry type
-        j = at + 1
-        while j < n and bib_text[j].isalpha():
-            j += 1
-        entry_type = bib_text[at+1:j].lower()
-        # skip whitespace until '{'
-        while j < n and bib_text[j].isspace():
-            j += 1
-        if j >= n or bib_text[j] != '{':
-            i = at + 1
-            continue
-        # Brace matching to find end of entry
-        start = at
-        depth = 0
-        k = j
-        while k < n:
-            ch = bib_text[k]
-            if ch == '{':
-                depth += 1
-            elif ch == '}':
-                depth -= 1
-                if depth == 0:
-                    k += 1  # include closing brace
-                    break
-            k += 1
-        block = bib_text[start:k]
-        i = k
-
-        if entry_type in ('string', 'preamble', 'comment'):
+    for raw in bibtools.scan_entries(bib_text):
+        block = bib_text[raw.start:raw.end]
+        if raw.type in bibtools.SPECIAL_TYPES or not raw.key:
+            # if no key, treat as special to preserve
             specials.append(block)
-            continue
-
-        # Extract key between first '{' and first ',' after it
-        try:
-            brace = block.find('{')
-            comma = block.find(',', brace+1)
-            key = block[brace+1:comma].strip()
-            if key:
-                entries[key] = block
-            else:
-                # if no key, treat as special to preserve
-                specials.append(block)
-        except Exception:
-            specials.append(block)
-
+        else:
+            entries[raw.key] = block
+            if links is not None:
+                targets = bibtools.entry_links(bib_text, raw)
+                if targets:
+                    links[raw.key] = targets
     return entries, specials
 
-def collect_with_crossrefs(selected: Set[str], entries: Dict[str, str]) -> Set[str]:
+def block_links(block: str) -> List[Tuple[str, str]]:
+    raw = next(bibtools.scan_entries(block), None)
+    return bibtools.entry_links(block, raw) if raw is not None else []
+
+def collect_with_crossrefs(selected: Set[str], entries: Dict[str, str], links: Optional[Links] = None,
+                           reasons: Optional[Dict[str, Tuple[str, str]]] = None) -> Set[str]:
     """
-    If selected entries contain 'crossref = {Parent}', include Parent as well.
-    Repeat until closure.
+    Add every entry reachable from the selected ones through crossref/xref/xdata/related/entryset
+    links (one breadth-first pass; each entry's links are looked at once).
+    links: index from find_bib_blocks; without it, reached blocks are inspected on the fly.
+    reasons: filled with pulled-in key -> (linking key, field), for --report-graph.
     """
     need = set(selected)
-    added = True
-    crossref_re = re.compile(r'(?im)^\s*crossref\s*=\s*[\{\"]\s*([^}\"]+)\s*[\}\"\']\s*,?\s*$')
-    while added:
-        added = False
-        for k in list(need):
-            block = entries.get(k)
-            if not block:
-                continue
-            for m in crossref_re.finditer(block):
-                parent = m.group(1).strip()
-                if parent and parent not in need and parent in entries:
-                    need.add(parent)
-                    added = True
+    queue = deque(k for k in sorted(selected) if k in entries)
+    while queue:
+        k = queue.popleft()
+        targets = links.get(k, ()) if links is not None else block_links(entries[k])
+        for field, parent in targets:
+            if parent not in need and parent in entries:
+                need.add(parent)
+                queue.append(parent)
+                if reasons is not None:
+                    reasons[parent] = (k, field)
     return need
 
-def write_bib(out_path: str, selected_blocks: List[str], specials: List[str]) -> None:
-    with open(out_path, "w", encoding="utf-8") as f:
-        # Keep @string/@preamble first (dedup by simple set of stripped lines)
-        seen = set()
-        for s in specials:
-            key = s.strip()
-            if key not in seen:
-                f.write(s.rstrip() + "\n\n")
-                seen.add(key)
-        for b in selected_blocks:
-            f.write(b.rstrip() + "\n\n")
+# ---------------- Streaming mode ----------------
+# The .bib is mmapped and only byte spans are kept; selected entries are copied from the map
+# to the output, so memory does not grow with the size of the library.
+Span = Tuple[int, int]
+
+def find_bib_spans(data, links: Optional[Links] = None) -> Tuple[Dict[str, Span], List[Span]]:
+    """find_bib_blocks over bytes/mmap: (start, end) byte offsets instead of text copies."""
+    entries: Dict[str, Span] = {}
+    specials: List[Span] = []
+    for raw in bibtools.scan_entries(data):
+        if raw.type in bibtools.SPECIAL_TYPES or not raw.key:
+            specials.append((raw.start, raw.end))
+        else:
+            entries[raw.key] = (raw.start, raw.end)
+            if links is not None:
+                targets = bibtools.entry_links(data, raw)
+                if targets:
+                    links[raw.key] = targets
+    return entries, specials
+
+def write_bib_spans(out_path: str, layers: List[Tuple[object, List[Span], List[Span]]]) -> int:
+    """bibtools.write_bib for byte spans; layers: (data, selected spans, special spans) per source file.
+    Return the number of bytes written.
+
+    Spans are written straight from the buffers; only blocks with \r line endings are copied
+    (to normalize them as text mode would)."""
+    n = 0
+    with open(out_path, "wb") as f:
+        def put(data, view, start: int, end: int) -> None:
+            nonlocal n
+            while end > start and data[end - 1:end].isspace():
+                end -= 1
+            if data.find(b"\r", start, end) != -1:
+                n += f.write(bytes(view[start:end]).replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+            else:
+                n += f.write(view[start:end])
+            n += f.write(b"\n\n")
+        views = [memoryview(data) for data, _, _ in layers]
+        try:
+            seen = set()
+            for (data, _, specials), view in zip(layers, views):
+                for start, end in specials:
+                    digest = hashlib.blake2b(bytes(view[start:end]).strip(), digest_size=16).digest()
+                    if digest not in seen:
+                        put(data, view, start, end)
+                        seen.add(digest)
+            for (data, selected, _), view in zip(layers, views):
+                for start, end in selected:
+                    put(data, view, start, end)
+        finally:
+            for view in views:
+                view.release()
+    return n
+
+def open_bib_map(path: str):
+    """Read-only mmap of path (b"" for an empty file)."""
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+def write_graph_report(out_path: str, cited: Set[str], keep: Set[str], entries: Dict[str, str],
+                       links: Links, reasons: Dict[str, Tuple[str, str]]) -> None:
+    """List pulled-in entries (with the chain back to a cited key) and links to keys not in the .bib."""
+    def chain(k: str) -> str:
+        path = [k]
+        while k in reasons:
+            k = reasons[k][0]
+            path.append(k)
+        return " <- ".join(path)
+    lines = [f"# {len(cited)} cited, {len(reasons)} pulled in by links, {len(keep & set(entries))} written"]
+    for k in sorted(reasons):
+        child, field = reasons[k]
+        lines.append(f"pulled\t{k}\t{field} of {child}\t{chain(k)}")
+    for k in sorted(keep):
+        for field, target in links.get(k, ()):
+            if target not in entries:
+                lines.append(f"dangling\t{target}\t{field} of {k}\t")
+    text = "\n".join(lines) + "\n"
+    if out_path == "-":
+        sys.stdout.write(text)
+    else:
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(text)
 
 def main():
     ap = argparse.ArgumentParser(description="Prune a large .bib to only entries cited in Markdown/Rmd files.")
     ap.add_argument("--schedule", required=True, help="Path to schedule Markdown/Rmd file to scan for citations.")
-    ap.add_argument("--bib", required=True, help="Path to the large .bib file to prune.")
+    ap.add_argument("--bib", action="append", required=True,
+                    help="Path to the large .bib file to prune; repeat for fallback libraries, highest priority "
+                         "first (a later one is read only while cited keys are still missing).")
+    ap.add_argument("--aliases", help="JSON alias map from merge_bibs.py: a cited alias selects its canonical entry.")
     ap.add_argument("--out", required=True, help="Path to write the pruned .bib.")
     ap.add_argument("--also", nargs="*", default=[], help="Additional Markdown/Rmd files to scan (optional).")
+    ap.add_argument("--stream", action="store_true",
+                    help="mmap the .bib and copy selected entries to --out by byte range (flat memory for huge libraries)")
+    ap.add_argument("--jobs", type=int, help="Threads for scanning --schedule/--also files (default: Python's pool default)")
+    ap.add_argument("--report-graph", nargs="?", const="-", metavar="FILE",
+                    help="List entries pulled in through crossref/xref/xdata/related/entryset links, and why "
+                         "(to FILE, or stdout)")
+    ap.add_argument("--strict", action="store_true",
+                    help="Exit 1 when a cited key is not in the .bib (after writing --out and listing suggestions)")
+    buildtimings.add_cli_options(ap)
     args = ap.parse_args()
+    timings = buildtimings.from_args(args)
 
     # 1) Collect citekeys
-    cited: Set[str] = set()
-    for path in [args.schedule, *args.also]:
-        if os.path.exists(path):
-            cited |= extract_keys_from_text(read_file(path))
-        else:
-            print(f"[warn] missing file (skipped): {path}")
+    with timings.stage("scan_sources"):
+        cited = collect_cited([args.schedule, *args.also], args.jobs)
 
     if not cited:
         print("[info] No citekeys detected — producing an empty pruned bib (strings/preamble preserved).")
+    if args.aliases:
+        aliases = bibtools.load_aliases(args.aliases)
+        cited = {aliases.get(k, k) for k in cited}
 
-    # 2) Parse .bib
-    bib_text = read_file(args.bib)
-    entries, specials = find_bib_blocks(bib_text)
-
-    # 3) Include crossref parents when present
-    final_keys = collect_with_crossrefs(cited, entries)
+    # 2) Parse the .bib files in priority order (streaming: index byte spans of the mmapped files),
+    #    3) and include crossref/xdata/related/set members when present. A lower-priority file is
+    #    read only while some cited or linked key is still missing; its entries fill only the gaps.
+    links: Links = {}
+    entries: Dict = {}
+    owner: Dict[str, int] = {}  # key -> index of the later file it was taken from (absent: the first)
+    layers = []  # (data, its entries, its specials) per file read
+    reasons: Dict[str, Tuple[str, str]] = {}
+    final_keys: Set[str] = set()
+    for path in args.bib:
+        if layers and all(k in entries for k in final_keys):
+            break
+        layer_links: Links = {}
+        if args.stream:
+            with timings.stage("map_bib"):
+                bib_data = open_bib_map(path)
+            with timings.stage("find_bib_spans"):
+                layer_entries, specials = find_bib_spans(bib_data, layer_links)
+        else:
+            with timings.stage("read_bib"):
+                bib_data = read_file(path)
+            with timings.stage("find_bib_blocks"):
+                layer_entries, specials = find_bib_blocks(bib_data, layer_links)
+        layers.append((bib_data, layer_entries, specials))
+        if len(layers) == 1:  # with more files to come, copy: later ones are merged into these
+            entries, links = ((layer_entries, layer_links) if len(args.bib) == 1
+                              else (dict(layer_entries), dict(layer_links)))
+        else:
+            for k, block in layer_entries.items():
+                if k not in entries:
+                    entries[k] = block
+                    owner[k] = len(layers) - 1
+                    if k in layer_links: links[k] = layer_links[k]
+        reasons = {}
+        with timings.stage("crossrefs"):
+            final_keys = collect_with_crossrefs(cited, entries, links, reasons)
 
-    # 4) Build list of blocks to write, in the order they appear in the original bib
-    selected_blocks: List[str] = []
-    seen = set()
-    for k, block in entries.items():
-        if k in final_keys and k not in seen:
-            selected_blocks.append(block)
-            seen.add(k)
+    # 4) Build list of blocks (or spans) to write, in the order they appear in each bib; a later
+    #    bib's @string/@preamble blocks are kept only if one of its entries is
+    per_layer = [[block for k, block in layer_entries.items() if k in final_keys and owner.get(k, 0) == i]
+                 for i, (_, layer_entries, _) in enumerate(layers)]
+    selected_blocks = [block for blocks in per_layer for block in blocks]
+    kept_specials = [specials if i == 0 or per_layer[i] else [] for i, (_, _, specials) in enumerate(layers)]
 
     # 5) Write pruned .bib
-    write_bib(args.out, selected_blocks, specials)
+    with timings.stage("write"):
+        if args.stream:
+            n_written = write_bib_spans(args.out, [(data, blocks, specials) for (data, _, _), blocks, specials
+                                                   in zip(layers, per_layer, kept_specials)])
+            for data, _, _ in layers:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        else:
+            n_written = bibtools.write_bib(args.out, selected_blocks, [s for specials in kept_specials for s in specials])
 
     # 6) Report
     missing = sorted([k for k in final_keys if k not in entries])
-    print(f"[done] cited keys: {len(cited)} | written entries: {len(selected_blocks)} | specials: {len(specials)}")
+    n_specials = sum(map(len, kept_specials))
+    print(f"[done] cited keys: {len(cited)} | written entries: {len(selected_blocks)} | specials: {n_specials}"
+          + (f" | bibs read: {len(layers)}/{len(args.bib)}" if len(args.bib) > 1 else ""))
     if missing:
-        print(f"[warn] {len(missing)} keys not found in .bib (first 20): {missing[:20]}")
+        with timings.stage("suggest"):
+            index = keysuggest.KeyIndex.from_keys(entries)
+            for line in keysuggest.format_missing(missing, index):
+                print(line)
+        print(f"[warn] {len(missing)} keys not found in .bib")
+    if args.report_graph:
+        write_graph_report(args.report_graph, cited, final_keys, entries, links, reasons)
+    timings.count("keys_cited", len(cited))
+    timings.count("linked_entries", len(links))
+    timings.count("pulled_in", len(reasons))
+    timings.count("bib_entries", len(entries))
+    timings.count("bibs_read", len(layers))
+    timings.count("entries_written", len(selected_blocks))
+    timings.count("keys_missing", len(missing))
+    timings.count("bytes_written" if args.stream else "chars_written", n_written)
+    timings.report(args.timings or "text", args.timings_out)
+    if args.strict and missing:
+        sys.exit(f"[error] {len(missing)} cited keys not in {', '.join(args.bib)} (--strict)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+schedule_server.py
+
+Local preview service: renders posted schedule markdown against a resident bib
+(build_schedule.SchedulePipeline) over plain http.server.
+
+- POST /render (body: markdown, UTF-8; optional ?refs=inline|table|shortcode) -> rendered markdown.
+  Headers: X-Cache (hit/miss) and X-Render-Us (time spent producing the body).
+- GET /stats -> JSON with bib size and cache counters.
+- Outputs are kept in an LRU cache keyed by a hash of (refs mode, input), so repeating a
+  preview is a dict lookup. The bib is re-loaded, and the cache cleared, when its size or
+  mtime changes.
+
+    python schedule_server.py --bib content/bib/grad_methods.bib --port 8711
+    curl --data-binary @content/schedule_bib.md http://127.0.0.1:8711/render
+"""
+import argparse, hashlib, json, os, threading, time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import build_schedule
+import buildcache
+import termcalendar
+
+DEFAULT_PORT = 8711
+DEFAULT_CACHE_SIZE = 256
+MAX_BODY = 16 * 1024 * 1024
+
+class OutputCache:
+    """LRU of rendered outputs: digest -> bytes."""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(refs: str, body: bytes) -> str:
+        return hashlib.blake2b(refs.encode("ascii") + b"\0" + body, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            out = self._items.get(key)
+            if out is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return out
+
+    def put(self, key: str, out: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = out
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+class RenderService:
+    """A SchedulePipeline plus the output cache, re-loading the bib when the file changes."""
+
+    def __init__(self, pipeline: build_schedule.SchedulePipeline, cache: OutputCache):
+        self.pipeline = pipeline
+        self.cache = cache
+        self._sig = self._bib_sig()
+        self._lock = threading.Lock()
+
+    def _bib_sig(self):
+        try:
+            st = os.stat(self.pipeline.bib_path)
+        except (OSError, TypeError):
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _check_bib(self) -> None:
+        sig = self._bib_sig()
+        if sig != self._sig:
+            with self._lock:
+                if sig != self._sig:
+                    self.pipeline.reload()
+                    self.cache.clear()
+                    self._sig = sig
+
+    def render(self, body: bytes, refs: str) -> Tuple[bytes, bool]:
+        """(rendered bytes, served from cache)."""
+        self._check_bib()
+        sig = self._sig
+        key = OutputCache.key(refs, body)
+        out = self.cache.get(key)
+        if out is not None:
+            return out, True
+        out = self.pipeline.render(body.decode("utf-8", errors="ignore"), refs).encode("utf-8")
+        with self._lock:
+            # a reload while we rendered cleared the cache; don't refill it from the old bib
+            if sig == self._sig:
+                self.cache.put(key, out)
+        return out, False
+
+    def stats(self) -> dict:
+        return {"entries": len(self.pipeline.entries), "cached_outputs": len(self.cache),
+                "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
+
+def make_handler(service: RenderService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code: int, body: bytes, ctype: str, extra: Optional[dict] = None) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path == "/stats":
+                self._send(200, json.dumps(service.stats()).encode("utf-8"), "application/json")
+            else:
+                self._send(404, b"not found\n", "text/plain; charset=utf-8")
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/render":
+                self._send(404, b"not found\n", "text/plain; charset=utf-8")
+                return
+            refs = parse_qs(url.query).get("refs", [service.pipeline.refs])[0]
+            if refs not in build_schedule.REFS_MODES:
+                self._send(400, f"unknown refs mode: {refs}\n".encode("utf-8"), "text/plain; charset=utf-8")
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                self._send(413, b"body too large\n", "text/plain; charset=utf-8")
+                return
+            body = self.rfile.read(length)
+            t0 = time.perf_counter()
+            out, hit = service.render(body, refs)
+            us = (time.perf_counter() - t0) * 1e6
+            self._send(200, out, "text/markdown; charset=utf-8",
+                       {"X-Cache": "hit" if hit else "miss", "X-Render-Us": f"{us:.0f}"})
+
+        def log_message(self, fmt, *args):
+            pass  # keep the console for [serve] lines
+    return Handler
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve schedule previews: POST markdown to /render, get the built markdown back.")
+    ap.add_argument("--bib", required=True, help="Path to .bib (kept parsed in memory, re-loaded when it changes)")
+    ap.add_argument("--host", default="127.0.0.1", help="Bind address (default 127.0.0.1)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default {DEFAULT_PORT})")
+    ap.add_argument("--tz", default="America/Chicago", help="IANA timezone (default America/Chicago)")
+    ap.add_argument("--start", default="2026-01-21", help="Start Wednesday YYYY-MM-DD (default 2026-01-21)")
+    termcalendar.add_cli_options(ap)
+    ap.add_argument("--refs", choices=build_schedule.REFS_MODES, default="inline", help="Default reference mode (default inline)")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                    help=f"Rendered outputs kept in the LRU cache (default {DEFAULT_CACHE_SIZE}; 0 disables)")
+    ap.add_argument("--no-cache", action="store_true", help="Do not use the on-disk bib/reference cache")
+    ap.add_argument("--cache-dir", default=buildcache.CACHE_DIR, help="On-disk cache directory (default .cache)")
+    args = ap.parse_args()
+    if not os.path.exists(args.bib): raise SystemExit(f"[error] bib not found: {args.bib}")
+
+    store = None if args.no_cache else buildcache.RefStore(args.cache_dir, build_schedule.FORMATTER_VERSION)
+    pipeline = build_schedule.SchedulePipeline(bib_path=args.bib, start=args.start, tz=args.tz, refs=args.refs,
+                                               use_cache=not args.no_cache, cache_dir=args.cache_dir, store=store,
+                                               term=termcalendar.from_args(args))
+    service = RenderService(pipeline, OutputCache(args.cache_size))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"[serve] {len(pipeline.entries)} entries from {args.bib}; POST markdown to http://{args.host}:{server.server_port}/render")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[serve] stopped")
+    finally:
+        server.server_close()
+        if store is not None: store.save()
+
+if __name__ == "__main__":
+    main()
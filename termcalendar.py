@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+termcalendar.py
+
+Academic calendar behind the advdate() date macros of build_schedule.py.
+
+- A Calendar holds, per series (lecture, section, and the legacy wed), a table of
+  week number -> session date and expanded macro text. It is built once per set of base dates
+  and declarations (get_calendar is memoized), so every macro is a list lookup.
+- Skipped weeks (spring break) drop out of the numbering: a session that would fall in the
+  Monday-Sunday week of a skipped date is moved on, and later weeks shift by one. Holidays keep
+  their week number; the session is labelled "(no class: <name>)".
+- Skipped weeks and holidays are declared in the markdown next to the base dates
+  (R setup chunk syntax):
+      skip_weeks <- as.Date(c("2026-03-30"))
+      holidays <- c("MLK Day" = "2026-01-19")
+  or on the command line (--skip-week DATE, --holiday DATE[=NAME]); both are combined.
+- to_json() / to_ical() export the sessions a document uses (with their heading titles), so
+  the site can offer a calendar feed (build_schedule.py --calendar-out). Re-exporting an .ics
+  bumps SEQUENCE/DTSTAMP of the events that changed since the file was last written.
+
+    python termcalendar.py content/schedule_bib.md --start 2026-01-21 --skip-week 2026-03-30 \\
+        --out static/schedule.ics --out data/calendar.json
+"""
+import argparse, functools, json, re, threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import buildcache
+
+KINDS = ("lecture", "section", "wed")
+DEFAULT_WEEKS = 16  # precomputed per series; longer terms extend the table on first use
+MAX_WEEKS = 520     # beyond this (or below 1), a week is plain weekly arithmetic, not a table row
+DEFAULT_HOLIDAY = "holiday"
+ICS_PRODID = "-//grad_research_methods//termcalendar//EN"
+
+ISO_DATE = r"\d{4}-\d{2}-\d{2}"
+SKIP_WEEKS_RE = re.compile(r"^\s*skip_weeks\s*<-\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+HOLIDAYS_RE = re.compile(r"^\s*holidays\s*<-\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+QUOTED_DATE_RE = re.compile(r"\"(" + ISO_DATE + r")\"")
+NAMED_DATE_RE = re.compile(r"(?:(?:\"(?P<qname>[^\"]+)\"|`(?P<bname>[^`]+)`|(?P<name>[A-Za-z_.][\w.]*))\s*=\s*)?"
+                           r"\"(?P<date>" + ISO_DATE + r")\"")
+HEADING_MACRO_RE = re.compile(
+    r"^#{1,6}[ \t]+`r\s+advdate\s*\(\s*(?P<kind>lecture|section|wed)\s*,\s*(?P<n>\d+)\s*\)`[ \t]*(?P<title>.*)$",
+    re.IGNORECASE | re.MULTILINE)
+MACRO_RE = re.compile(r"\badvdate\s*\(\s*(?P<kind>lecture|section|wed)\s*,\s*(?P<n>\d+)\s*\)", re.IGNORECASE)
+
+class TermDates(NamedTuple):
+    """Declared exceptions to the weekly rhythm."""
+    skip_weeks: Tuple[date, ...] = ()
+    holidays: Tuple[Tuple[date, str], ...] = ()  # (date, name), sorted by date
+
+    def merged(self, other: "TermDates") -> "TermDates":
+        """Both declarations; other's holiday names win."""
+        return TermDates(tuple(sorted(set(self.skip_weeks) | set(other.skip_weeks))),
+                         tuple(sorted({**dict(self.holidays), **dict(other.holidays)}.items())))
+
+NO_TERM_DATES = TermDates()
+
+class Session(NamedTuple):
+    kind: str      # lecture | section | wed
+    week: int
+    date: date
+    label: str     # what advdate(kind, week) expands to
+    holiday: str   # holiday name, "" when the session meets
+
+# ---------------- Declarations ----------------
+def iso_date(text: str) -> date:
+    return date.fromisoformat(text.strip())
+
+def holiday_arg(text: str) -> Tuple[date, str]:
+    """DATE or DATE=NAME (argparse type for --holiday)."""
+    day, _, name = text.partition("=")
+    return iso_date(day), name.strip() or DEFAULT_HOLIDAY
+
+def parse_declarations(md: str) -> TermDates:
+    """skip_weeks <- ... / holidays <- ... lines of the markdown (NO_TERM_DATES when there are none)."""
+    if "skip_weeks" not in md and "holidays" not in md:
+        return NO_TERM_DATES
+    skips = {iso_date(d) for m in SKIP_WEEKS_RE.finditer(md) for d in QUOTED_DATE_RE.findall(m.group(1))}
+    holidays: Dict[date, str] = {}
+    for m in HOLIDAYS_RE.finditer(md):
+        for h in NAMED_DATE_RE.finditer(m.group(1)):
+            holidays[iso_date(h.group("date"))] = h.group("qname") or h.group("bname") or h.group("name") or DEFAULT_HOLIDAY
+    return TermDates(tuple(sorted(skips)), tuple(sorted(holidays.items())))
+
+def add_cli_options(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--skip-week", dest="skip_weeks", action="append", type=iso_date, default=[], metavar="DATE",
+                    help="No classes in the week containing DATE (e.g. spring break); later weeks shift by one. Repeatable")
+    ap.add_argument("--holiday", dest="holidays", action="append", type=holiday_arg, default=[], metavar="DATE[=NAME]",
+                    help="A session on DATE does not meet (numbering unchanged). Repeatable")
+
+def from_args(args: argparse.Namespace) -> TermDates:
+    return TermDates(tuple(sorted(set(args.skip_weeks))), tuple(sorted(dict(args.holidays).items())))
+
+# ---------------- Table ----------------
+# The expanded texts mirror the Rmd's advdate() helper (mm/dd with fixed weekday labels) and the
+# legacy full-date form of advdate(wed, n).
+def _lecture_label(n: int, d: date) -> str:
+    return f"Week {n:02d}, Wednesday, {d.strftime('%m/%d')}"
+
+def _section_label(n: int, d: date) -> str:
+    return f"Section: Monday, {d.strftime('%m/%d')}"
+
+def _wed_label(n: int, d: date) -> str:
+    return f"Week {n} ({d.strftime('%A, %B ')}{d.day}, {d.year})"
+
+LABELS: Dict[str, Callable[[int, date], str]] = {"lecture": _lecture_label, "section": _section_label, "wed": _wed_label}
+
+def _monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+class Calendar:
+    """Week number -> Session for each series, from base dates (kind -> first session) and TermDates."""
+
+    def __init__(self, bases: Dict[str, date], term: TermDates = NO_TERM_DATES, weeks: int = DEFAULT_WEEKS):
+        self.bases = dict(bases)
+        self.term = term
+        self._skipped = {_monday(d) for d in term.skip_weeks}
+        self._holidays = dict(term.holidays)
+        self._tables: Dict[str, List[Session]] = {kind: [] for kind in self.bases}
+        self._next = dict(self.bases)  # next candidate date per series
+        self._lock = threading.Lock()  # SchedulePipeline shares calendars between threads
+        for kind in self.bases:
+            self._extend(kind, weeks)
+
+    @property
+    def key(self) -> str:
+        """Stable description of everything the table depends on (for build manifests)."""
+        return json.dumps([sorted((k, d.isoformat()) for k, d in self.bases.items()),
+                           [d.isoformat() for d in self.term.skip_weeks],
+                           [(d.isoformat(), name) for d, name in self.term.holidays]])
+
+    def _extend(self, kind: str, weeks: int) -> None:
+        with self._lock:
+            table = self._tables[kind]
+            d = self._next[kind]
+            while len(table) < weeks:
+                if _monday(d) not in self._skipped:
+                    n = len(table) + 1
+                    holiday = self._holidays.get(d, "")
+                    label = LABELS[kind](n, d) + (f" (no class: {holiday})" if holiday else "")
+                    table.append(Session(kind, n, d, label, holiday))
+                d += timedelta(days=7)
+            self._next[kind] = d
+
+    def session(self, kind: str, n: int) -> Session:
+        table = self._tables[kind]
+        if not 0 < n <= MAX_WEEKS:  # outside any term: plain weekly arithmetic, as advdate() does
+            d = self.bases[kind] + timedelta(days=7 * (n - 1))
+            return Session(kind, n, d, LABELS[kind](n, d), "")
+        if n > len(table):
+            self._extend(kind, n)
+        return table[n - 1]
+
+    def label(self, kind: str, n: int) -> str:
+        if 0 < n <= len(self._tables[kind]):
+            return self._tables[kind][n - 1].label
+        return self.session(kind, n).label
+
+    def sessions(self, kind: Optional[str] = None) -> List[Session]:
+        """The precomputed sessions (of one series, or all), in date order."""
+        kinds = [kind] if kind else list(self._tables)
+        return sorted((s for k in kinds for s in self._tables[k]), key=lambda s: (s.date, KINDS.index(s.kind)))
+
+@functools.lru_cache(maxsize=32)
+def get_calendar(lecture: date, section: date, start: date, term: TermDates = NO_TERM_DATES) -> Calendar:
+    """The Calendar for these bases and declarations, built once per run."""
+    return Calendar({"lecture": lecture, "section": section, "wed": start}, term)
+
+# ---------------- Export ----------------
+Scheduled = Tuple[Session, str]  # session, heading title ("" when the macro is not in a heading)
+
+def document_sessions(md: str, calendar: Calendar) -> List[Scheduled]:
+    """Every session the document's advdate() macros name, in date order, with heading titles."""
+    titles: Dict[Tuple[str, int], str] = {}
+    for m in HEADING_MACRO_RE.finditer(md):
+        title = m.group("title").strip().strip("_*").strip()
+        titles.setdefault((m.group("kind").lower(), int(m.group("n"))), title)
+    used = {(m.group("kind").lower(), int(m.group("n"))) for m in MACRO_RE.finditer(md)}
+    scheduled = [(calendar.session(kind, n), titles.get((kind, n), "")) for kind, n in used]
+    scheduled.sort(key=lambda x: (x[0].date, KINDS.index(x[0].kind), x[0].week))
+    return scheduled
+
+def to_json(scheduled: Iterable[Scheduled], calendar: Optional[Calendar] = None) -> str:
+    data = {"sessions": [{"kind": s.kind, "week": s.week, "date": s.date.isoformat(), "label": s.label,
+                          "title": title, "holiday": s.holiday} for s, title in scheduled]}
+    if calendar is not None:
+        data = {"bases": {k: d.isoformat() for k, d in sorted(calendar.bases.items())},
+                "skip_weeks": [d.isoformat() for d in calendar.term.skip_weeks],
+                "holidays": {d.isoformat(): name for d, name in calendar.term.holidays}, **data}
+    return json.dumps(data, ensure_ascii=False, indent=1) + "\n"
+
+def _ics_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _ics_fold(line: str) -> str:
+    """Lines over 75 octets continue on the next line after a space (RFC 5545, 3.1)."""
+    out, cur = [], ""
+    for ch in line:
+        if len((cur + ch).encode("utf-8")) > 75:
+            out.append(cur)
+            cur = " "
+        cur += ch
+    out.append(cur)
+    return "\r\n".join(out)
+
+def _ics_events(feed: str) -> Dict[str, Tuple[int, str, List[str]]]:
+    """UID -> (SEQUENCE, DTSTAMP, other property lines) of each VEVENT in an earlier to_ical() feed."""
+    events: Dict[str, Tuple[int, str, List[str]]] = {}
+    props: Optional[Dict[str, str]] = None
+    body: List[str] = []
+    for line in feed.replace("\r\n ", "").splitlines():
+        if line == "BEGIN:VEVENT":
+            props, body = {}, []
+        elif line == "END:VEVENT" and props is not None:
+            if "UID" in props:
+                seq = props.get("SEQUENCE", "0")
+                events[props["UID"]] = (int(seq) if seq.isdigit() else 0, props.get("DTSTAMP", ""), body)
+            props = None
+        elif props is not None:
+            prop = line.split(":", 1)[0]
+            if prop in ("UID", "SEQUENCE", "DTSTAMP"):
+                props[prop] = line[len(prop) + 1:]
+            else:
+                body.append(line)
+    return events
+
+def to_ical(scheduled: Iterable[Scheduled], name: str = "Course schedule", previous: str = "",
+            now: Optional[datetime] = None) -> str:
+    """All-day VEVENTs. previous: the feed as last written; an event whose content changed since
+    (e.g. a holiday cancelled it) gets SEQUENCE + 1 and DTSTAMP = now, so subscribed clients take
+    the update, while unchanged events keep theirs and unchanged feeds stay byte-identical."""
+    scheduled = list(scheduled)
+    # DTSTAMP is required; for events new to the feed the first session's date keeps the output deterministic
+    stamp = (scheduled[0][0].date if scheduled else date(1970, 1, 1)).strftime("%Y%m%dT000000Z")
+    now_stamp = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    before = _ics_events(previous) if previous else {}
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{ICS_PRODID}", "CALSCALE:GREGORIAN",
+             f"X-WR-CALNAME:{_ics_text(name)}"]
+    for s, title in scheduled:
+        summary = f"{s.label} — {title}" if title else s.label
+        uid = f"{s.kind}-{s.week:02d}-{s.date:%Y%m%d}@termcalendar"
+        body = [f"DTSTART;VALUE=DATE:{s.date:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{s.date + timedelta(days=1):%Y%m%d}",
+                f"SUMMARY:{_ics_text(summary)}"]
+        if s.holiday:
+            body.append("STATUS:CANCELLED")
+        seq, dtstamp = 0, stamp
+        if uid in before:
+            seq, dtstamp, old_body = before[uid]
+            if old_body != body:
+                seq, dtstamp = seq + 1, now_stamp
+        lines += ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{dtstamp}", f"SEQUENCE:{seq}", *body, "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_ics_fold(line) for line in lines) + "\r\n"
+
+def export(path: str, scheduled: List[Scheduled], calendar: Optional[Calendar] = None,
+           name: str = "Course schedule") -> bool:
+    """Write .ics or .json (by extension) if its content changed; return whether it was written."""
+    if not path.lower().endswith((".ics", ".ical")):
+        return buildcache.write_text_if_changed(path, to_json(scheduled, calendar))
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            previous = f.read()
+    except OSError:
+        previous = ""
+    return buildcache.write_text_if_changed(path, to_ical(scheduled, name, previous))
+
+def main():
+    import build_schedule
+    ap = argparse.ArgumentParser(description="Print or export the session calendar of a schedule markdown file.")
+    ap.add_argument("md", help="Schedule markdown (e.g. content/schedule_bib.md)")
+    ap.add_argument("--start", default="2026-01-21", help="Start Wednesday YYYY-MM-DD (default 2026-01-21)")
+    ap.add_argument("--out", action="append", default=[], help="Write the calendar to this .ics or .json file (repeatable)")
+    ap.add_argument("--name", default="Course schedule", help="Calendar name in the .ics feed")
+    add_cli_options(ap)
+    args = ap.parse_args()
+    with open(args.md, "r", encoding="utf-8", errors="ignore") as f:
+        md = f.read()
+    calendar = build_schedule.term_calendar(md, datetime.strptime(args.start, "%Y-%m-%d"), from_args(args))
+    scheduled = document_sessions(md, calendar)
+    if not args.out:
+        for s, title in scheduled:
+            print(f"{s.date.isoformat()}  {s.label}" + (f"  {title}" if title else ""))
+    for path in args.out:
+        changed = export(path, scheduled, calendar, args.name)
+        print(f"[done] {'wrote' if changed else 'unchanged'} {path} ({len(scheduled)} sessions)")
+
+if __name__ == "__main__":
+    main()